@@ -0,0 +1,61 @@
+# bench_checkin.py
+"""Benchmark check-in absensi: commit per request vs mode burst (group commit).
+
+Jalankan: python bench_checkin.py [jumlah_karyawan] [jumlah_thread]
+Memakai database SQLite sementara, database utama tidak disentuh.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+_tmpdir = tempfile.mkdtemp()
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from flask import Flask  # noqa: E402
+from holycity.extensions import db  # noqa: E402
+from models import Attendance  # noqa: E402
+from services.absensi_service import add_attendance, CheckinWriter  # noqa: E402
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+
+def run(app, label, checkin):
+    with app.app_context():
+        Attendance.query.delete()
+        db.session.commit()
+
+    def worker(ids):
+        with app.app_context():
+            for i in ids:
+                checkin(f"karyawan{i}")
+                checkin(f"karyawan{i}")  # percobaan double absen, harus ditolak
+            db.session.remove()
+
+    chunks = [range(t, N, THREADS) for t in range(THREADS)]
+    threads = [threading.Thread(target=worker, args=(c,)) for c in chunks]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        rows = Attendance.query.count()
+    print(f"{label:<22} {2 * N / elapsed:8.0f} check-in/detik  ({rows} tersimpan dari {2 * N} percobaan)")
+
+
+if __name__ == "__main__":
+    # app minimal: cukup database, tanpa blueprint & admin default
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ["SQLALCHEMY_DATABASE_URI"]
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+    run(app, "commit per request", lambda u: add_attendance(u, "Masuk", 0.0, 0.0))
+    writer = CheckinWriter()
+    run(app, "burst (group commit)", lambda u: writer.submit(u, "Masuk", 0.0, 0.0).result())
@@ -0,0 +1,79 @@
+# bench_offer_letters.py
+"""Benchmark surat penawaran massal: throughput render PDF per jumlah pekerja.
+
+Jalankan: python bench_offer_letters.py [jumlah_surat] [pekerja,pekerja,...]
+Memakai database & folder cache sementara, data utama tidak disentuh.
+Butuh WeasyPrint beserta library sistemnya (pango) terpasang.
+"""
+import os
+import sys
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp()
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from flask import Flask, render_template  # noqa: E402
+from holycity import create_app  # noqa: E402
+from holycity.extensions import db  # noqa: E402
+from services import pdf_service  # noqa: E402
+from services.pdf_service import batch_status, pdf_key, submit_batch  # noqa: E402
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+WORKERS = ([int(w) for w in sys.argv[2].split(",")] if len(sys.argv) > 2
+           else sorted({1, os.cpu_count() or 1}))
+PRODUCTS = ["Sewa Genset 500 kVA", "Instalasi Panel Listrik", "Maintenance Tahunan"]
+
+
+def jobs(prefix, count):
+    for i in range(count):
+        params = {"company_name": f"PT {prefix} {i:05d}", "company_address": "Jl. Contoh No. 1",
+                  "products": PRODUCTS}
+
+        def render_html(params=params):
+            return render_template("marketing/offer_letter.html", title="Surat Penawaran",
+                                   as_pdf=True, **params)
+
+        yield pdf_key("marketing/offer_letter.html", params), render_html, f"surat_{i:05d}.pdf"
+
+
+def wait(batch_id):
+    while not (status := batch_status(batch_id))["finished"]:
+        time.sleep(0.05)
+    return status
+
+
+def run(app, workers):
+    if pdf_service._pool is not None:
+        pdf_service._pool.shutdown()
+        pdf_service._pool = None
+    app.config["PDF_WORKERS"] = workers
+    app.config["PDF_CACHE_DIR"] = tempfile.mkdtemp(dir=_tmpdir)
+
+    with app.test_request_context(base_url="http://localhost/"):
+        # pemanasan: tiap pekerja memuat font, CSS & logo sekali
+        wait(submit_batch(jobs(f"warmup{workers}", workers), base_url="http://localhost/"))
+
+        start = time.perf_counter()
+        status = wait(submit_batch(jobs(f"bench{workers}", N), base_url="http://localhost/"))
+        elapsed = time.perf_counter() - start
+
+    per_minute = status["done"] / elapsed * 60
+    print(f"{workers:>2} pekerja  {per_minute:8.0f} surat/menit  "
+          f"{per_minute / workers:8.0f} surat/menit/core  "
+          f"({status['done']} jadi, {status['failed']} gagal, {elapsed:.1f} detik)")
+
+
+if __name__ == "__main__":
+    # create_app membuat admin default, jadi tabel harus sudah ada
+    bootstrap = Flask(__name__)
+    bootstrap.config["SQLALCHEMY_DATABASE_URI"] = os.environ["SQLALCHEMY_DATABASE_URI"]
+    db.init_app(bootstrap)
+    with bootstrap.app_context():
+        import models  # noqa: F401
+        db.create_all()
+
+    app = create_app()
+    print(f"{N} surat penawaran per putaran, {os.cpu_count()} core tersedia")
+    for workers in WORKERS:
+        run(app, workers)
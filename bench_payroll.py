@@ -0,0 +1,78 @@
+# bench_payroll.py
+"""Benchmark payroll bulanan: hitung & simpan satu bulan untuk banyak karyawan.
+
+Jalankan: python bench_payroll.py [jumlah_karyawan] [pekerja,pekerja,...]
+Memakai database SQLite sementara, database utama tidak disentuh.
+Target: 2.000 karyawan selesai dalam hitungan detik.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp()
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from holycity.extensions import db  # noqa: E402
+from models import Attendance, Employee  # noqa: E402
+from services.hrd_service import PAYROLL_UTC_OFFSET, run_payroll, working_days_in  # noqa: E402
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+WORKERS = ([int(w) for w in sys.argv[2].split(",")] if len(sys.argv) > 2
+           else sorted({1, os.cpu_count() or 1}))
+YEAR, MONTH = 2026, 1
+PERIOD = f"{YEAR}-{MONTH:02d}"
+
+
+def seed():
+    """N karyawan; tiap hari kerja ~95% masuk (acak telat/lembur), sebagian
+    bergabung di tengah bulan. Jam absen disimpan UTC seperti aplikasi."""
+    rng = random.Random(42)
+    db.session.execute(insert(Employee), [
+        {"name": f"Karyawan {i:05d}", "department": f"Dept {i % 12}",
+         "join_date": date(YEAR, MONTH, 15) if i % 50 == 0 else date(2020, 1, 1),
+         "salary": 5_000_000 + (i % 20) * 250_000}
+        for i in range(N)
+    ])
+    employees = db.session.execute(db.select(Employee.id, Employee.join_date)).all()
+    days = [date(YEAR, MONTH, d) for d in range(1, 32) if date(YEAR, MONTH, d).weekday() < 5]
+    rows = []
+    for emp_id, join_date in employees:
+        for day in days:
+            if day < join_date or rng.random() < 0.05:
+                continue
+            check_in = datetime.combine(day, datetime.min.time()) + timedelta(
+                hours=8, minutes=rng.randint(-20, 30))
+            check_out = check_in + timedelta(hours=8, minutes=rng.randint(0, 120))
+            for status, ts in (("Masuk", check_in), ("Keluar", check_out)):
+                rows.append({"username": f"user{emp_id}", "employee_id": emp_id, "status": status,
+                             "timestamp": ts - PAYROLL_UTC_OFFSET, "day": day})
+        if len(rows) >= 20_000:
+            db.session.execute(insert(Attendance), rows)
+            rows.clear()
+    if rows:
+        db.session.execute(insert(Attendance), rows)
+    db.session.commit()
+    return len(employees), db.session.query(Attendance).count()
+
+
+if __name__ == "__main__":
+    # app minimal: cukup database, tanpa blueprint & admin default
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ["SQLALCHEMY_DATABASE_URI"]
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        employees, events = seed()
+        print(f"{employees} karyawan, {events} absen, "
+              f"{working_days_in(YEAR, MONTH)} hari kerja di {PERIOD}")
+        for workers in WORKERS:
+            start = time.perf_counter()
+            run = run_payroll(PERIOD, workers=workers, force=True)
+            elapsed = time.perf_counter() - start
+            print(f"{workers:>2} pekerja  {elapsed:6.2f} detik  "
+                  f"({run.employee_count} slip, total Rp {run.total_net:,.0f})")
@@ -1,7 +1,43 @@
-from flask import Blueprint, render_template, request, make_response, redirect, url_for, flash
-from weasyprint import HTML
+import re
+import click
+from flask import (
+    Blueprint, Response, abort, current_app, jsonify, render_template, request, redirect,
+    url_for, flash, send_file, stream_with_context
+)
+from flask_login import current_user, login_required
+from werkzeug.utils import secure_filename
 from models import db, MarketingProspect, MarketingLead, MarketingProject, MarketingFollowUp, MarketingClient
 from datetime import datetime
+from services.pdf_service import (
+    batch_status, pdf_key, pdf_path, pdf_status, pdf_token, render_pdf, stream_batch_zip,
+    submit_batch
+)
+from services.marketing_service import (
+    LEADS_PAGE_SIZE, MERGE_THRESHOLD, MAX_PAGE_SIZE, OFFER_LETTER_BATCH_MAX, PROJECTS_PAGE_SIZE,
+    count_statements,
+    duplicate_clusters, find_duplicates, funnel_summary, leads_page, merge_duplicates,
+    offer_letter_candidates, offer_letter_recipients, projects_page, prospect_options,
+    rebuild_funnel, recent_followups, record_followup, record_lead, record_project,
+    record_prospect, reindex_names
+)
+
+
+MARKETING_ROLES = ("admin", "marketing")
+
+
+def _require_marketing():
+    if current_user.role not in MARKETING_ROLES:
+        abort(403)
+
+
+def _form_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _flash_duplicates(matches):
+    if matches:
+        names = ", ".join(f"{m['company'] or m['name']} ({m['kind']} #{m['id']})" for m in matches)
+        flash(f"Kemungkinan duplikat dengan: {names}.", "warning")
 
 # =====================================================
 # === INISIALISASI BLUEPRINT MARKETING ===============
@@ -21,30 +57,33 @@ def marketing_dashboard():
     """Dashboard utama marketing"""
     return render_template(
         'marketing/dashboard.html',
-        title="Dashboard Marketing"
+        title="Dashboard Marketing",
+        funnel=funnel_summary()
     )
 
+
+@marketing_bp.cli.command("rebuild-funnel")
+def rebuild_funnel_command():
+    """Hitung ulang agregat funnel marketing dari seluruh data."""
+    rebuild_funnel()
+    db.session.commit()
+    stages = funnel_summary()["stages"]
+    click.echo(", ".join(f"{s['title']}: {s['total']}" for s in stages))
+
 # =====================================================
 # === DATA LEADS / PROSPEK ============================
 # =====================================================
 @marketing_bp.route('/leads')
 def marketing_leads():
     """Daftar prospek dan leads marketing"""
-    try:
-        prospects = MarketingProspect.query.order_by(MarketingProspect.created_at.desc()).all()
-    except Exception:
-        prospects = MarketingProspect.query.order_by(MarketingProspect.id.desc()).all()
-
-    try:
-        leads = MarketingLead.query.order_by(MarketingLead.created_at.desc()).all()
-    except Exception:
-        leads = MarketingLead.query.order_by(MarketingLead.id.desc()).all()
-
+    pagination = leads_page(page=request.args.get('page', 1, type=int),
+                            per_page=request.args.get('per_page', LEADS_PAGE_SIZE, type=int))
     return render_template(
         'marketing/leads.html',
         title="Data Leads",
-        prospects=prospects,
-        leads=leads
+        prospects=prospect_options(),
+        leads=pagination.items,
+        pagination=pagination
     )
 
 # =====================================================
@@ -72,6 +111,44 @@ def marketing_clients():
     )
 
 
+@marketing_bp.route('/duplicates')
+@login_required
+def marketing_duplicates():
+    """Saran "kemungkinan duplikat" untuk form client/prospek (JSON)"""
+    _require_marketing()
+    return jsonify(find_duplicates(company=request.args.get('company', '').strip(),
+                                   name=request.args.get('name', '').strip()))
+
+
+@marketing_bp.cli.command("reindex-names")
+def reindex_names_command():
+    """Bangun ulang index nama client/prospek untuk deteksi duplikat."""
+    count = reindex_names()
+    db.session.commit()
+    click.echo(f"{count} nama diindex.")
+
+
+@marketing_bp.cli.command("dedupe")
+@click.option("--threshold", type=float, default=MERGE_THRESHOLD, show_default=True,
+              help="Skor kemiripan trigram minimal (0..1).")
+@click.option("--merge", is_flag=True, help="Gabungkan duplikat ke record dengan id terkecil.")
+def dedupe_command(threshold, merge):
+    """Cari (dan opsional gabungkan) client/prospek duplikat."""
+    clusters = duplicate_clusters(threshold=threshold)
+    if not clusters:
+        click.echo("Tidak ada duplikat.")
+        return
+    for cluster in clusters:
+        click.echo(" | ".join(f"{m['kind']} #{m['id']}: {m['company'] or '-'} / {m['name'] or '-'}"
+                              for m in cluster))
+    click.echo(f"{len(clusters)} kelompok duplikat.")
+    if merge:
+        removed = sum(merge_duplicates(cluster) for cluster in clusters)
+        rebuild_funnel()
+        db.session.commit()
+        click.echo(f"{removed} record duplikat digabung.")
+
+
 @marketing_bp.route('/add_client', methods=['POST'])
 def add_client():
     """Tambah data client baru"""
@@ -83,6 +160,7 @@ def add_client():
     if not name or not company:
         flash("Nama dan perusahaan wajib diisi!", "warning")
         return redirect(url_for('marketing.marketing_clients'))
+    duplicates = find_duplicates(company=company, name=name)
 
     new_client = MarketingClient(
         name=name,
@@ -94,6 +172,7 @@ def add_client():
     db.session.add(new_client)
     db.session.commit()
     flash("Client baru berhasil ditambahkan!", "success")
+    _flash_duplicates(duplicates)
     return redirect(url_for('marketing.marketing_clients'))
 
 # =====================================================
@@ -102,23 +181,40 @@ def add_client():
 @marketing_bp.route('/targets')
 def marketing_targets():
     """Target dan performa tim marketing"""
-    try:
-        projects = MarketingProject.query.order_by(MarketingProject.created_at.desc()).all()
-    except Exception:
-        projects = MarketingProject.query.order_by(MarketingProject.id.desc()).all()
-
-    try:
-        followups = MarketingFollowUp.query.order_by(MarketingFollowUp.date.desc()).all()
-    except Exception:
-        followups = MarketingFollowUp.query.order_by(MarketingFollowUp.id.desc()).all()
-
+    pagination = projects_page(page=request.args.get('page', 1, type=int),
+                               per_page=request.args.get('per_page', PROJECTS_PAGE_SIZE, type=int))
     return render_template(
         'marketing/targets.html',
         title="Target & Kinerja Tim",
-        projects=projects,
-        followups=followups
+        projects=pagination.items,
+        pagination=pagination,
+        followups=recent_followups()
     )
 
+
+@marketing_bp.cli.command("check-queries")
+def check_queries_command():
+    """Pastikan jumlah statement SQL per halaman tidak bergantung jumlah baris."""
+    client = current_app.test_client()
+    bad = []
+    for endpoint in ('marketing.marketing_leads', 'marketing.marketing_targets'):
+        counts = {}
+        for per_page in (1, MAX_PAGE_SIZE):
+            with current_app.test_request_context():
+                url = url_for(endpoint, per_page=per_page)
+            with count_statements() as executed:
+                response = client.get(url)
+            if response.status_code != 200:
+                raise click.ClickException(f"{url} -> HTTP {response.status_code}")
+            counts[per_page] = len(executed)
+        click.echo(f"{endpoint}: " + ", ".join(f"{n} baris/halaman = {c} statement"
+                                               for n, c in counts.items()))
+        if len(set(counts.values())) > 1:
+            bad.append(endpoint)
+    if bad:
+        raise click.ClickException(f"Jumlah statement bergantung jumlah baris (N+1): {', '.join(bad)}")
+    click.echo("Jumlah statement per halaman tetap.")
+
 # =====================================================
 # === SURAT PENAWARAN (FORM + PDF) ====================
 # =====================================================
@@ -131,25 +227,27 @@ def marketing_offer_letter():
         products_text = request.form.get("products") or ""
         products = [p.strip() for p in products_text.splitlines() if p.strip()]
 
-        html_content = render_template(
-            'marketing/offer_letter.html',
-            title="Surat Penawaran",
-            company_name=company_name,
-            company_address=company_address,
-            products=products,
-            as_pdf=True,
-        )
-
-        try:
-            pdf = HTML(string=html_content, base_url=request.root_url).write_pdf()
-            resp = make_response(pdf)
-            resp.headers["Content-Type"] = "application/pdf"
-            resp.headers["Content-Disposition"] = f'inline; filename=surat_penawaran_{company_name}.pdf'
-            return resp
-        except Exception as e:
-            print("ERROR saat generate PDF:", e)
-            flash("Gagal membuat PDF — periksa logo atau isian.", "danger")
+        params = {"company_name": company_name, "company_address": company_address,
+                  "products": products}
+        key = pdf_key('marketing/offer_letter.html', params)
+
+        def render_html():
+            return render_template(
+                'marketing/offer_letter.html',
+                title="Surat Penawaran",
+                as_pdf=True,
+                **params
+            )
+
+        filename = f"surat_penawaran_{company_name}.pdf"
+        status = render_pdf(key, render_html, base_url=request.root_url)
+        if status == "done":
+            return send_file(pdf_path(key), mimetype="application/pdf", download_name=filename)
+        if status == "failed":
+            flash(f"Gagal membuat PDF — periksa logo atau isian. ({pdf_status(key)[1]})", "danger")
             return redirect(url_for('marketing.marketing_offer_letter'))
+        return redirect(url_for('pdf.pdf_download', token=pdf_token(key), name=filename,
+                                back=url_for('marketing.marketing_offer_letter')))
 
     return render_template(
         'marketing/offer_letter.html',
@@ -157,6 +255,78 @@ def marketing_offer_letter():
         as_pdf=False
     )
 
+@marketing_bp.route('/offer-letter/batch', methods=['GET', 'POST'])
+@login_required
+def marketing_offer_letter_batch():
+    """Surat penawaran massal: satu PDF per client/prospek terpilih, diunduh sebagai ZIP"""
+    _require_marketing()
+    if request.method == 'POST':
+        products = [p.strip() for p in (request.form.get("products") or "").splitlines() if p.strip()]
+        client_ids = request.form.getlist('client_ids', type=int)
+        prospect_ids = request.form.getlist('prospect_ids', type=int)
+        if len(client_ids) + len(prospect_ids) > OFFER_LETTER_BATCH_MAX:
+            flash(f"Maksimal {OFFER_LETTER_BATCH_MAX} surat per batch.", "warning")
+            return redirect(url_for('marketing.marketing_offer_letter_batch'))
+        recipients = offer_letter_recipients(client_ids=client_ids, prospect_ids=prospect_ids)
+        if not recipients or not products:
+            flash("Pilih minimal satu client/prospek dan isi daftar produk.", "warning")
+            return redirect(url_for('marketing.marketing_offer_letter_batch'))
+
+        def job(company_name, company_address):
+            params = {"company_name": company_name, "company_address": company_address,
+                      "products": products}
+
+            def render_html():
+                return render_template('marketing/offer_letter.html', title="Surat Penawaran",
+                                       as_pdf=True, **params)
+
+            filename = secure_filename(f"surat_penawaran_{company_name}.pdf") or "surat_penawaran.pdf"
+            return pdf_key('marketing/offer_letter.html', params), render_html, filename
+
+        batch_id = submit_batch((job(*r) for r in recipients), base_url=request.root_url)
+        return redirect(url_for('marketing.offer_letter_batch_status', batch_id=batch_id))
+
+    clients, prospects = offer_letter_candidates()
+    return render_template(
+        'marketing/offer_letter_batch.html',
+        title="Surat Penawaran Massal",
+        clients=clients,
+        prospects=prospects,
+        batch=None
+    )
+
+
+@marketing_bp.route('/offer-letter/batch/<batch_id>')
+@login_required
+def offer_letter_batch_status(batch_id):
+    """Progres batch surat penawaran; halaman dimuat ulang sampai semua selesai (202)."""
+    _require_marketing()
+    if not re.fullmatch(r"[0-9a-f]{64}", batch_id):
+        abort(404)
+    batch = batch_status(batch_id)
+    if batch is None:
+        abort(404)
+    return render_template(
+        'marketing/offer_letter_batch.html',
+        title="Surat Penawaran Massal",
+        batch=batch,
+        batch_id=batch_id
+    ), 200 if batch["finished"] else 202
+
+
+@marketing_bp.route('/offer-letter/batch/<batch_id>/zip')
+@login_required
+def offer_letter_batch_zip(batch_id):
+    """Unduh semua PDF batch yang sudah jadi sebagai satu ZIP (streaming)."""
+    _require_marketing()
+    if not re.fullmatch(r"[0-9a-f]{64}", batch_id) or batch_status(batch_id) is None:
+        abort(404)
+    return Response(
+        stream_with_context(stream_batch_zip(batch_id)),
+        mimetype="application/zip",
+        headers={"Content-Disposition": "attachment; filename=surat_penawaran.zip"},
+    )
+
 # =====================================================
 # === FUNGSI TAMBAHAN UNTUK INPUT / CRUD DATA =========
 # =====================================================
@@ -172,6 +342,7 @@ def add_prospect():
     if not name:
         flash("Nama prospek wajib diisi!", "danger")
         return redirect(url_for('marketing.marketing_leads'))
+    duplicates = find_duplicates(company=company, name=name)
 
     new_data = MarketingProspect(
         client_name=name,
@@ -181,8 +352,10 @@ def add_prospect():
         source=source
     )
     db.session.add(new_data)
+    record_prospect(new_data)
     db.session.commit()
     flash("Prospek baru berhasil ditambahkan!", "success")
+    _flash_duplicates(duplicates)
     return redirect(url_for('marketing.marketing_leads'))
 
 
@@ -190,13 +363,14 @@ def add_prospect():
 def add_lead():
     """Tambah lead baru"""
     lead = MarketingLead(
-        prospect_id=request.form.get('prospect_id'),
+        prospect_id=request.form.get('prospect_id', type=int),
         product_interest=request.form.get('product_interest'),
-        estimated_value=request.form.get('estimated_value'),
+        estimated_value=request.form.get('estimated_value', type=float),
         stage=request.form.get('stage'),
         notes=request.form.get('notes')
     )
     db.session.add(lead)
+    record_lead(lead)
     db.session.commit()
     flash("Lead baru berhasil ditambahkan!", "success")
     return redirect(url_for('marketing.marketing_leads'))
@@ -206,15 +380,16 @@ def add_lead():
 def add_project():
     """Tambah proyek baru"""
     project = MarketingProject(
-        lead_id=request.form.get('lead_id'),
+        lead_id=request.form.get('lead_id', type=int),
         project_name=request.form.get('project_name'),
-        start_date=request.form.get('start_date'),
-        end_date=request.form.get('end_date'),
+        start_date=request.form.get('start_date', type=_form_date),
+        end_date=request.form.get('end_date', type=_form_date),
         status=request.form.get('status'),
-        budget=request.form.get('budget'),
+        budget=request.form.get('budget', type=float),
         remarks=request.form.get('remarks')
     )
     db.session.add(project)
+    record_project(project)
     db.session.commit()
     flash("Project baru berhasil ditambahkan!", "success")
     return redirect(url_for('marketing.marketing_targets'))
@@ -224,12 +399,13 @@ def add_project():
 def add_followup():
     """Tambah follow-up baru"""
     followup = MarketingFollowUp(
-        project_id=request.form.get('project_id'),
+        project_id=request.form.get('project_id', type=int),
         contact_person=request.form.get('contact_person'),
         method=request.form.get('method'),
         result=request.form.get('result')
     )
     db.session.add(followup)
+    record_followup(followup)
     db.session.commit()
     flash("Follow-up berhasil ditambahkan!", "success")
     return redirect(url_for('marketing.marketing_targets'))
\ No newline at end of file
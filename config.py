@@ -22,5 +22,25 @@ class Config:
         os.getenv("SQLALCHEMY_TRACK_MODIFICATIONS", "False").lower() == "true"
     )
 
+    # Mode burst absensi: check-in diantrikan & ditulis per batch oleh satu writer
+    ABSENSI_BURST_MODE = os.getenv("ABSENSI_BURST_MODE", "False").lower() == "true"
+    # Lama request menunggu hasil writer (detik) sebelum menjawab "diproses"
+    ABSENSI_BURST_TIMEOUT = float(os.getenv("ABSENSI_BURST_TIMEOUT", "5"))
+
+    # Render PDF: jumlah proses WeasyPrint, folder cache, dan lama request
+    # menunggu sebelum dialihkan ke halaman "sedang disiapkan" (detik)
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+    PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(BASE_DIR, "instance", "pdf_cache"))
+    PDF_SYNC_WAIT = float(os.getenv("PDF_SYNC_WAIT", "3"))
+
+    # Folder sementara file mutasi bank yang menunggu diimport di latar
+    IMPORT_DIR = os.getenv("IMPORT_DIR", os.path.join(BASE_DIR, "instance", "imports"))
+
+    # Upload store content-addressed (foto absensi, bukti transaksi)
+    UPLOAD_STORE_DIR = os.getenv("UPLOAD_STORE_DIR", os.path.join(BASE_DIR, "instance", "uploads"))
+    UPLOAD_CACHE_MAX_AGE = 365 * 24 * 3600
+    # Batas body request (byte); ditolak 413 sebelum body dibaca
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", str(32 * 1024 * 1024)))
+
     # Mode environment (development / production)
     FLASK_ENV = os.getenv("FLASK_ENV", "development")
\ No newline at end of file
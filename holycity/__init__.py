@@ -15,12 +15,15 @@ from models import (
     MarketingProject,
     MarketingFollowUp,
 )
+from holycity import data_version  # noqa: F401  (daftarkan event stempel versi data)
 
 from routes.absensi import absensi_bp
 from routes.hrd import hrd_bp
 from routes.accounting import accounting_bp
 from blueprints.marketing import marketing_bp
 from routes.purchasing import purchasing_bp
+from routes.pdf import pdf_bp
+from routes.uploads import uploads_bp
 
 
 def create_app():
@@ -73,6 +76,8 @@ def create_app():
     app.register_blueprint(accounting_bp)
     app.register_blueprint(marketing_bp)
     app.register_blueprint(purchasing_bp)
+    app.register_blueprint(pdf_bp)
+    app.register_blueprint(uploads_bp)
 
     # --- Routes utama ---
     @app.route("/")
@@ -0,0 +1,68 @@
+"""
+File : holycity/data_version.py
+Stempel versi data per tabel. Setiap flush ORM maupun statement
+insert/update/delete lewat session menaikkan penghitung tabel yang
+tersentuh (dalam transaksi yang sama), sehingga cache turunan — laporan,
+snapshot, PDF — cukup membandingkan versi tanpa memindai data.
+
+Biaya: tiap kenaikan versi adalah satu UPDATE ke baris data_versions yang
+sama di dalam transaksi penulis. Di SQLite itu menambah tulisan ke baris
+"panas" dan ikut mengantrekan penulis lain, jadi hanya tabel di
+VERSIONED_TABLES (sumber cache laporan/analitik/PDF) yang diberi versi;
+check-in absensi mentah, funnel marketing, dsb. tidak membayar biaya ini.
+Cache baru yang bergantung pada tabel lain harus menambahkannya di sini.
+"""
+
+from sqlalchemy import event, select, update, insert
+from sqlalchemy.orm import Session
+from models import db, DataVersion
+
+_TABLE = DataVersion.__table__
+# tabel yang dipakai get_version(): report_service.REPORTS, analitik kinerja
+# (hrd_service._cached) dan PDF mutasi (routes/accounting.py)
+VERSIONED_TABLES = frozenset({"attendance_daily", "employees", "performance", "transactions"})
+
+
+def _bump(connection, tables):
+    tables = set(tables) & VERSIONED_TABLES
+    for name in sorted(tables):
+        result = connection.execute(
+            update(_TABLE).where(_TABLE.c.table_name == name)
+            .values(version=_TABLE.c.version + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(_TABLE).values(table_name=name, version=1))
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    tables = {
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, "__table__") and (obj not in session.dirty or session.is_modified(obj))
+    }
+    if tables & VERSIONED_TABLES:
+        _bump(session.connection(), tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_execute(orm_execute_state):
+    # insert/update/delete massal (Core atau ORM bulk) tidak melewati flush
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update
+            or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    name = getattr(table, "name", None)
+    if name in VERSIONED_TABLES:
+        _bump(orm_execute_state.session.connection(), [name])
+
+
+def get_version(*tables):
+    """Stempel versi gabungan, mis. 'attendance_daily:12|employees:3'."""
+    unknown = set(tables) - VERSIONED_TABLES
+    if unknown:
+        raise ValueError(f"Tabel tanpa versi data: {', '.join(sorted(unknown))}")
+    rows = dict(db.session.execute(
+        select(_TABLE.c.table_name, _TABLE.c.version).where(_TABLE.c.table_name.in_(tables))
+    ).all())
+    return "|".join(f"{name}:{rows.get(name, 0)}" for name in sorted(tables))
@@ -0,0 +1,25 @@
+"""
+File : holycity/tasks.py
+Antrian kerja latar belakang (in-process) untuk pekerjaan yang tidak perlu
+ditunggu request: pembuatan thumbnail, penulisan batch, laporan, dsb.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+
+# --- Executor bersama (thread ringan, cukup untuk I/O & Pillow) ---
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="holycity-bg")
+
+
+def submit(fn, *args, **kwargs):
+    """Jalankan fn di thread latar. Bila dipanggil di dalam app context,
+    context yang sama dibuka ulang di thread pekerja. Return Future."""
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def run():
+        if app is None:
+            return fn(*args, **kwargs)
+        with app.app_context():
+            return fn(*args, **kwargs)
+
+    return _executor.submit(run)
@@ -0,0 +1,44 @@
+"""backfill attendance.employee_id from users
+
+Revision ID: 0b6e4d9a2c73
+Revises: f3a7d2e8c615
+Create Date: 2025-11-14 09:12:41.205318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e4d9a2c73'
+down_revision = 'f3a7d2e8c615'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade():
+    # index (employee_id, timestamp) sudah dibuat di d2f8a6c41b57;
+    # di sini hanya mengisi employee_id untuk baris lama, per rentang id
+    conn = op.get_bind()
+    max_id = conn.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM attendance")).scalar()
+    for lo in range(0, max_id, BATCH_SIZE):
+        conn.execute(sa.text("""
+            UPDATE attendance
+            SET employee_id = (SELECT u.employee_id FROM users u
+                               WHERE u.username = attendance.username)
+            WHERE id > :lo AND id <= :hi AND employee_id IS NULL
+        """), {"lo": lo, "hi": lo + BATCH_SIZE})
+
+    op.execute("""
+        UPDATE attendance_daily
+        SET employee_id = (SELECT u.employee_id FROM users u
+                           WHERE u.username = attendance_daily.username)
+        WHERE employee_id IS NULL
+    """)
+
+
+def downgrade():
+    # pengisian data tidak dibatalkan: employee_id hasil backfill tetap valid
+    pass
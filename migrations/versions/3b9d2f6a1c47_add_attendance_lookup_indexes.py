@@ -0,0 +1,28 @@
+"""add attendance lookup indexes
+
+Revision ID: 3b9d2f6a1c47
+Revises: e47ca5290f3e
+Create Date: 2025-10-28 09:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d2f6a1c47'
+down_revision = 'e47ca5290f3e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.create_index('ix_attendance_username_status_timestamp', ['username', 'status', 'timestamp'], unique=False)
+        batch_op.create_index('ix_attendance_status_timestamp', ['status', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.drop_index('ix_attendance_status_timestamp')
+        batch_op.drop_index('ix_attendance_username_status_timestamp')
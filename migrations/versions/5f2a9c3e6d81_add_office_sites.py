@@ -0,0 +1,37 @@
+"""add office_sites for multi-site geofencing
+
+Revision ID: 5f2a9c3e6d81
+Revises: 8c1e4a7d9b20
+Create Date: 2025-11-03 10:22:05.117640
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2a9c3e6d81'
+down_revision = '8c1e4a7d9b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    office_sites = op.create_table('office_sites',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('radius_m', sa.Float(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # kantor pusat yang sebelumnya di-hardcode di absensi_service
+    op.bulk_insert(office_sites, [
+        {'name': 'Kantor Pusat', 'latitude': -6.914744, 'longitude': 107.609810,
+         'radius_m': 5.0, 'active': True},
+    ])
+
+
+def downgrade():
+    op.drop_table('office_sites')
@@ -0,0 +1,54 @@
+"""add account_balances snapshot table
+
+Revision ID: 7d4c2a9e1f58
+Revises: 0b6e4d9a2c73
+Create Date: 2025-11-15 10:04:27.611934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d4c2a9e1f58'
+down_revision = '0b6e4d9a2c73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('account_balances',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('account', sa.String(length=100), nullable=False),
+    sa.Column('period', sa.String(length=7), nullable=False),
+    sa.Column('income', sa.Float(), nullable=False),
+    sa.Column('expense', sa.Float(), nullable=False),
+    sa.Column('net', sa.Float(), nullable=False),
+    sa.Column('closing_balance', sa.Float(), nullable=True),
+    sa.Column('closed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('account', 'period', name='uq_account_balances_account_period')
+    )
+    with op.batch_alter_table('account_balances', schema=None) as batch_op:
+        batch_op.create_index('ix_account_balances_period', ['period'], unique=False)
+
+    # isi baris terbuka per akun per bulan dari ledger. Bulan-bulan lalu tetap
+    # terbuka (saldo dashboard tetap benar, hanya menjumlah lebih banyak baris)
+    # sampai transaksi/import berikutnya atau `flask accounting close-periods`
+    op.execute("""
+        INSERT INTO account_balances (account, period, income, expense, net)
+        SELECT COALESCE(account, ''), strftime('%Y-%m', date),
+               COALESCE(SUM(CASE WHEN category = 'income' THEN amount ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN category = 'expense' THEN amount ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN category = 'income' THEN amount ELSE -amount END), 0)
+        FROM transactions
+        WHERE date IS NOT NULL
+        GROUP BY COALESCE(account, ''), strftime('%Y-%m', date)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('account_balances', schema=None) as batch_op:
+        batch_op.drop_index('ix_account_balances_period')
+
+    op.drop_table('account_balances')
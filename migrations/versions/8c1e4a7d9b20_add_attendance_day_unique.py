@@ -0,0 +1,41 @@
+"""add attendance.day with unique (username, status, day)
+
+Revision ID: 8c1e4a7d9b20
+Revises: 3b9d2f6a1c47
+Create Date: 2025-10-30 07:41:12.884213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1e4a7d9b20'
+down_revision = '3b9d2f6a1c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('day', sa.Date(), nullable=True))
+
+    # isi day = tanggal WIB dari timestamp (UTC), sama dengan aplikasi;
+    # duplikat lama (status sama di hari sama) dibiarkan NULL agar unique
+    # index bisa dibuat tanpa menghapus data historis
+    op.execute("""
+        UPDATE attendance SET day = date(timestamp, '+7 hours')
+        WHERE id IN (
+            SELECT MIN(id) FROM attendance
+            GROUP BY username, status, date(timestamp, '+7 hours')
+        )
+    """)
+
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.create_index('uq_attendance_username_status_day', ['username', 'status', 'day'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.drop_index('uq_attendance_username_status_day')
+        batch_op.drop_column('day')
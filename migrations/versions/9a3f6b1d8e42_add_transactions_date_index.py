@@ -0,0 +1,26 @@
+"""index transactions.date for paged mutasi
+
+Revision ID: 9a3f6b1d8e42
+Revises: 7d4c2a9e1f58
+Create Date: 2025-11-15 14:37:52.480116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3f6b1d8e42'
+down_revision = '7d4c2a9e1f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_transactions_date', ['date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_transactions_date')
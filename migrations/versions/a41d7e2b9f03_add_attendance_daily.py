@@ -0,0 +1,61 @@
+"""add attendance_daily rollup table
+
+Revision ID: a41d7e2b9f03
+Revises: 5f2a9c3e6d81
+Create Date: 2025-11-05 14:03:27.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41d7e2b9f03'
+down_revision = '5f2a9c3e6d81'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attendance_daily',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=100), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=True),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('first_in', sa.DateTime(), nullable=True),
+    sa.Column('last_out', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(length=25), nullable=False),
+    sa.Column('minutes_worked', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('username', 'day', name='uq_attendance_daily_username_day')
+    )
+    with op.batch_alter_table('attendance_daily', schema=None) as batch_op:
+        batch_op.create_index('ix_attendance_daily_day_status', ['day', 'status'], unique=False)
+
+    # isi awal dari log absensi yang sudah ada (sama dengan `flask absensi rebuild-daily`)
+    op.execute("""
+        INSERT INTO attendance_daily
+            (username, employee_id, day, first_in, last_out, status, minutes_worked)
+        SELECT username, employee_id, day, first_in, last_out, status,
+               CASE WHEN first_in IS NOT NULL AND last_out > first_in
+                    THEN CAST((julianday(last_out) - julianday(first_in)) * 1440 AS INTEGER)
+                    ELSE 0 END
+        FROM (
+            SELECT username,
+                   MAX(employee_id) AS employee_id,
+                   date(timestamp, '+7 hours') AS day,  -- tanggal WIB
+                   MIN(CASE WHEN status = 'Masuk' THEN timestamp END) AS first_in,
+                   MAX(CASE WHEN status = 'Keluar' THEN timestamp END) AS last_out,
+                   CASE WHEN MAX(status != 'Izin') = 1 THEN 'Hadir' ELSE 'Izin' END AS status
+            FROM attendance
+            GROUP BY username, date(timestamp, '+7 hours')
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('attendance_daily', schema=None) as batch_op:
+        batch_op.drop_index('ix_attendance_daily_day_status')
+
+    op.drop_table('attendance_daily')
@@ -0,0 +1,27 @@
+"""index transactions (category, date) for ranged mutasi filters
+
+Revision ID: b8e2d5c7a391
+Revises: 9a3f6b1d8e42
+Create Date: 2025-11-16 08:51:13.907264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e2d5c7a391'
+down_revision = '9a3f6b1d8e42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # transactions(date) sudah ada sejak 9a3f6b1d8e42
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.create_index('ix_transactions_category_date', ['category', 'date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('ix_transactions_category_date')
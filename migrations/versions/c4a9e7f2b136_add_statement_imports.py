@@ -0,0 +1,43 @@
+"""transactions.import_hash and statement_imports for bank-statement import
+
+Revision ID: c4a9e7f2b136
+Revises: b8e2d5c7a391
+Create Date: 2025-11-17 11:26:05.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a9e7f2b136'
+down_revision = 'b8e2d5c7a391'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('statement_imports',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('account', sa.String(length=100), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('inserted', sa.Integer(), nullable=False),
+    sa.Column('duplicates', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('errors', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('import_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index('uq_transactions_import_hash', ['import_hash'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('uq_transactions_import_hash')
+        batch_op.drop_column('import_hash')
+
+    op.drop_table('statement_imports')
@@ -0,0 +1,56 @@
+"""add employees_fts full-text index
+
+Revision ID: c7e3b5a2d914
+Revises: a41d7e2b9f03
+Create Date: 2025-11-07 11:46:52.230871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e3b5a2d914'
+down_revision = 'a41d7e2b9f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # index FTS5 external-content: teks tetap di tabel employees,
+    # trigger menjaga index tetap sinkron
+    op.execute("""
+        CREATE VIRTUAL TABLE employees_fts USING fts5(
+            name, department, position,
+            content='employees', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER employees_fts_ai AFTER INSERT ON employees BEGIN
+            INSERT INTO employees_fts(rowid, name, department, position)
+            VALUES (new.id, new.name, new.department, new.position);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER employees_fts_ad AFTER DELETE ON employees BEGIN
+            INSERT INTO employees_fts(employees_fts, rowid, name, department, position)
+            VALUES ('delete', old.id, old.name, old.department, old.position);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER employees_fts_au AFTER UPDATE OF name, department, position ON employees BEGIN
+            INSERT INTO employees_fts(employees_fts, rowid, name, department, position)
+            VALUES ('delete', old.id, old.name, old.department, old.position);
+            INSERT INTO employees_fts(rowid, name, department, position)
+            VALUES (new.id, new.name, new.department, new.position);
+        END
+    """)
+    op.execute("INSERT INTO employees_fts(employees_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS employees_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS employees_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS employees_fts_ai")
+    op.execute("DROP TABLE IF EXISTS employees_fts")
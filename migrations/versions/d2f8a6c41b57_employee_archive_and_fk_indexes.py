@@ -0,0 +1,44 @@
+"""employee archive flag and employee_id indexes for set-based delete
+
+Revision ID: d2f8a6c41b57
+Revises: c7e3b5a2d914
+Create Date: 2025-11-10 16:28:09.774415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f8a6c41b57'
+down_revision = 'c7e3b5a2d914'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.create_index('ix_attendance_employee_id_timestamp', ['employee_id', 'timestamp'], unique=False)
+
+    with op.batch_alter_table('attendance_daily', schema=None) as batch_op:
+        batch_op.create_index('ix_attendance_daily_employee_id', ['employee_id'], unique=False)
+
+    with op.batch_alter_table('performance', schema=None) as batch_op:
+        batch_op.create_index('ix_performance_employee_id', ['employee_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('performance', schema=None) as batch_op:
+        batch_op.drop_index('ix_performance_employee_id')
+
+    with op.batch_alter_table('attendance_daily', schema=None) as batch_op:
+        batch_op.drop_index('ix_attendance_daily_employee_id')
+
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.drop_index('ix_attendance_employee_id_timestamp')
+
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.drop_column('archived_at')
@@ -0,0 +1,38 @@
+"""add marketing_funnel_stats aggregate table
+
+Revision ID: d2f8b4a6c917
+Revises: c4a9e7f2b136
+Create Date: 2025-11-18 09:12:44.207391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f8b4a6c917'
+down_revision = 'c4a9e7f2b136'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # diisi dari tabel marketing saat dashboard pertama kali dibuka
+    # (atau lewat `flask marketing rebuild-funnel`)
+    op.create_table('marketing_funnel_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('stage', sa.String(length=20), nullable=False),
+    sa.Column('label', sa.String(length=50), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('converted', sa.Integer(), nullable=False),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.Column('days_sum', sa.Float(), nullable=False),
+    sa.Column('days_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('stage', 'label', name='uq_marketing_funnel_stats_stage_label')
+    )
+
+
+def downgrade():
+    op.drop_table('marketing_funnel_stats')
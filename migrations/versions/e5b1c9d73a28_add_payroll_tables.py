@@ -0,0 +1,51 @@
+"""add payroll_runs and payslips
+
+Revision ID: e5b1c9d73a28
+Revises: d2f8a6c41b57
+Create Date: 2025-11-13 13:51:40.209563
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1c9d73a28'
+down_revision = 'd2f8a6c41b57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('payroll_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=7), nullable=False),
+    sa.Column('working_days', sa.Integer(), nullable=False),
+    sa.Column('employee_count', sa.Integer(), nullable=False),
+    sa.Column('total_net', sa.Float(), nullable=False),
+    sa.Column('closed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('period')
+    )
+    op.create_table('payslips',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('base_salary', sa.Float(), nullable=False),
+    sa.Column('worked_days', sa.Integer(), nullable=False),
+    sa.Column('late_minutes', sa.Integer(), nullable=False),
+    sa.Column('overtime_minutes', sa.Integer(), nullable=False),
+    sa.Column('absence_deduction', sa.Float(), nullable=False),
+    sa.Column('late_deduction', sa.Float(), nullable=False),
+    sa.Column('overtime_pay', sa.Float(), nullable=False),
+    sa.Column('net_pay', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ),
+    sa.ForeignKeyConstraint(['run_id'], ['payroll_runs.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('run_id', 'employee_id', name='uq_payslips_run_employee')
+    )
+
+
+def downgrade():
+    op.drop_table('payslips')
+    op.drop_table('payroll_runs')
@@ -0,0 +1,73 @@
+"""marketing_name_keys + trigram FTS5 index for duplicate detection
+
+Revision ID: e9c3a7d5b204
+Revises: d2f8b4a6c917
+Create Date: 2025-11-19 14:03:51.664218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9c3a7d5b204'
+down_revision = 'd2f8b4a6c917'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # isi dihitung di Python (normalisasi nama), dibangun saat pencarian
+    # duplikat pertama kali dipakai atau lewat `flask marketing reindex-names`
+    op.create_table('marketing_name_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=10), nullable=False),
+    sa.Column('ref_id', sa.Integer(), nullable=False),
+    sa.Column('company_key', sa.String(length=150), nullable=False),
+    sa.Column('name_key', sa.String(length=150), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'ref_id', name='uq_marketing_name_keys_kind_ref')
+    )
+    with op.batch_alter_table('marketing_name_keys', schema=None) as batch_op:
+        batch_op.create_index('ix_marketing_name_keys_company_key', ['company_key'], unique=False)
+
+    # index trigram FTS5 external-content (SQLite >= 3.34), disinkronkan trigger
+    op.execute("""
+        CREATE VIRTUAL TABLE marketing_name_fts USING fts5(
+            company_key, name_key,
+            content='marketing_name_keys', content_rowid='id',
+            tokenize='trigram'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER marketing_name_fts_ai AFTER INSERT ON marketing_name_keys BEGIN
+            INSERT INTO marketing_name_fts(rowid, company_key, name_key)
+            VALUES (new.id, new.company_key, new.name_key);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER marketing_name_fts_ad AFTER DELETE ON marketing_name_keys BEGIN
+            INSERT INTO marketing_name_fts(marketing_name_fts, rowid, company_key, name_key)
+            VALUES ('delete', old.id, old.company_key, old.name_key);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER marketing_name_fts_au AFTER UPDATE OF company_key, name_key ON marketing_name_keys BEGIN
+            INSERT INTO marketing_name_fts(marketing_name_fts, rowid, company_key, name_key)
+            VALUES ('delete', old.id, old.company_key, old.name_key);
+            INSERT INTO marketing_name_fts(rowid, company_key, name_key)
+            VALUES (new.id, new.company_key, new.name_key);
+        END
+    """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS marketing_name_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS marketing_name_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS marketing_name_fts_ai")
+    op.execute("DROP TABLE IF EXISTS marketing_name_fts")
+
+    with op.batch_alter_table('marketing_name_keys', schema=None) as batch_op:
+        batch_op.drop_index('ix_marketing_name_keys_company_key')
+
+    op.drop_table('marketing_name_keys')
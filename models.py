@@ -35,13 +35,18 @@ class Employee(db.Model):
     position = db.Column(db.String(100))
     join_date = db.Column(db.Date, default=lambda: datetime.utcnow().date())
     salary = db.Column(db.Float, default=0.0)
+    archived_at = db.Column(db.DateTime)  # soft-delete: terisi = karyawan diarsipkan
 
     user = db.relationship("User", back_populates="employee", uselist=False)
+    # passive_deletes: baris anak dihapus set-based (services.hrd_service.delete_employee),
+    # ORM tidak perlu memuat seluruh riwayat ke session
     attendance_records = db.relationship(
-        "Attendance", back_populates="employee", lazy="dynamic", cascade="all, delete-orphan"
+        "Attendance", back_populates="employee", lazy="dynamic",
+        cascade="all, delete-orphan", passive_deletes=True
     )
     performance_records = db.relationship(
-        "Performance", back_populates="employee", lazy="dynamic", cascade="all, delete-orphan"
+        "Performance", back_populates="employee", lazy="dynamic",
+        cascade="all, delete-orphan", passive_deletes=True
     )
 
     def __repr__(self):
@@ -51,6 +56,12 @@ class Employee(db.Model):
 # ---------- DATA ABSENSI ----------
 class Attendance(db.Model):
     __tablename__ = "attendance"
+    __table_args__ = (
+        db.Index("ix_attendance_username_status_timestamp", "username", "status", "timestamp"),
+        db.Index("ix_attendance_status_timestamp", "status", "timestamp"),
+        db.Index("uq_attendance_username_status_day", "username", "status", "day", unique=True),
+        db.Index("ix_attendance_employee_id_timestamp", "employee_id", "timestamp"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100), nullable=False)
@@ -59,6 +70,7 @@ class Attendance(db.Model):
     longitude = db.Column(db.Float)
     photo = db.Column(db.String(255))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    day = db.Column(db.Date)  # tanggal absen, kunci unik 1x per status per hari
     employee_id = db.Column(db.Integer, db.ForeignKey("employees.id"))
     employee = db.relationship("Employee", back_populates="attendance_records")
 
@@ -66,9 +78,35 @@ class Attendance(db.Model):
         return f"<Attendance {self.username} ({self.status}) @ {self.timestamp:%Y-%m-%d %H:%M:%S}>"
 
 
+# ---------- REKAP ABSENSI HARIAN ----------
+class AttendanceDaily(db.Model):
+    """Satu baris per karyawan per hari, diperbarui setiap absensi ditulis."""
+    __tablename__ = "attendance_daily"
+    __table_args__ = (
+        db.UniqueConstraint("username", "day", name="uq_attendance_daily_username_day"),
+        db.Index("ix_attendance_daily_day_status", "day", "status"),
+        db.Index("ix_attendance_daily_employee_id", "employee_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(100), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey("employees.id"))
+    day = db.Column(db.Date, nullable=False)
+    first_in = db.Column(db.DateTime)
+    last_out = db.Column(db.DateTime)
+    status = db.Column(db.String(25), nullable=False)  # Hadir / Izin
+    minutes_worked = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AttendanceDaily {self.username} {self.day} {self.status}>"
+
+
 # ---------- PENILAIAN KINERJA ----------
 class Performance(db.Model):
     __tablename__ = "performance"
+    __table_args__ = (
+        db.Index("ix_performance_employee_id", "employee_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey("employees.id"))
@@ -83,9 +121,92 @@ class Performance(db.Model):
         return f"<Performance emp={self.employee_id} {self.period}={self.score}>"
 
 
+# ---------- PAYROLL ----------
+class PayrollRun(db.Model):
+    """Satu run payroll per periode; run yang sudah ditutup tidak dihitung ulang."""
+    __tablename__ = "payroll_runs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(7), unique=True, nullable=False)  # YYYY-MM
+    working_days = db.Column(db.Integer, nullable=False)
+    employee_count = db.Column(db.Integer, nullable=False, default=0)
+    total_net = db.Column(db.Float, nullable=False, default=0.0)
+    closed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    payslips = db.relationship("Payslip", back_populates="run", lazy="dynamic",
+                               cascade="all, delete-orphan", passive_deletes=True)
+
+    def __repr__(self):
+        return f"<PayrollRun {self.period} ({self.employee_count} karyawan)>"
+
+
+class Payslip(db.Model):
+    __tablename__ = "payslips"
+    __table_args__ = (
+        db.UniqueConstraint("run_id", "employee_id", name="uq_payslips_run_employee"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey("payroll_runs.id"), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey("employees.id"), nullable=False)
+    base_salary = db.Column(db.Float, nullable=False, default=0.0)
+    worked_days = db.Column(db.Integer, nullable=False, default=0)
+    late_minutes = db.Column(db.Integer, nullable=False, default=0)
+    overtime_minutes = db.Column(db.Integer, nullable=False, default=0)
+    absence_deduction = db.Column(db.Float, nullable=False, default=0.0)
+    late_deduction = db.Column(db.Float, nullable=False, default=0.0)
+    overtime_pay = db.Column(db.Float, nullable=False, default=0.0)
+    net_pay = db.Column(db.Float, nullable=False, default=0.0)
+
+    run = db.relationship("PayrollRun", back_populates="payslips")
+
+    def __repr__(self):
+        return f"<Payslip run={self.run_id} emp={self.employee_id} net={self.net_pay}>"
+
+
+# ---------- VERSI DATA & HASIL LAPORAN ----------
+class DataVersion(db.Model):
+    """Penghitung perubahan per tabel; naik setiap ada insert/update/delete."""
+    __tablename__ = "data_versions"
+
+    table_name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DataVersion {self.table_name}={self.version}>"
+
+
+class ReportResult(db.Model):
+    """Output laporan yang sudah dirender, kunci: laporan + parameter + format + versi data."""
+    __tablename__ = "report_results"
+    __table_args__ = (
+        db.UniqueConstraint("report", "params", "format", "data_version",
+                            name="uq_report_results_key"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    report = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.String(255), nullable=False)  # JSON terurut
+    format = db.Column(db.String(10), nullable=False)   # html / csv / pdf
+    data_version = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending / done / failed
+    content = db.Column(db.LargeBinary)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<ReportResult {self.report} {self.params} {self.format} ({self.status})>"
+
+
 # ---------- TRANSAKSI KEUANGAN ----------
 class Transaction(db.Model):
     __tablename__ = "transactions"
+    __table_args__ = (
+        db.Index("ix_transactions_date", "date"),
+        db.Index("ix_transactions_category_date", "category", "date"),
+        db.Index("uq_transactions_import_hash", "import_hash", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, default=lambda: datetime.utcnow().date())
@@ -95,11 +216,54 @@ class Transaction(db.Model):
     account = db.Column(db.String(100))
     amount = db.Column(db.Float)
     receipt = db.Column(db.String(255))
+    import_hash = db.Column(db.String(64))  # sha256 kunci alami baris mutasi bank (dedupe import)
 
     def __repr__(self):
         return f"<Transaction {self.category} {self.amount}>"
 
 
+class StatementImport(db.Model):
+    """Satu job import file mutasi rekening (CSV bank) beserta laporannya."""
+    __tablename__ = "statement_imports"
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    account = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending / done / failed
+    inserted = db.Column(db.Integer, nullable=False, default=0)
+    duplicates = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text)  # JSON [[baris, pesan], ...]
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<StatementImport {self.filename} ({self.status})>"
+
+
+class AccountBalance(db.Model):
+    """Rekap per akun per bulan. Baris terbuka (closed_at kosong) menampung
+    delta bulan berjalan secara inkremental; saat ditutup closing_balance
+    berisi saldo akhir akun pada bulan tersebut."""
+    __tablename__ = "account_balances"
+    __table_args__ = (
+        db.UniqueConstraint("account", "period", name="uq_account_balances_account_period"),
+        db.Index("ix_account_balances_period", "period"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    account = db.Column(db.String(100), nullable=False, default="")
+    period = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    income = db.Column(db.Float, nullable=False, default=0.0)
+    expense = db.Column(db.Float, nullable=False, default=0.0)
+    net = db.Column(db.Float, nullable=False, default=0.0)  # income - selain income
+    closing_balance = db.Column(db.Float)
+    closed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<AccountBalance {self.account or '-'} {self.period} {self.closing_balance}>"
+
+
 # ---------- MARKETING ----------
 class MarketingProspect(db.Model):
     __tablename__ = "marketing_prospects"
@@ -171,6 +335,27 @@ class MarketingFollowUp(db.Model):
     def __repr__(self):
         return f"<FollowUp {self.project_id} via {self.method}>"
 
+class MarketingFunnelStat(db.Model):
+    """Agregat funnel marketing per tahap & label (status prospek, tahap lead,
+    status proyek). Diperbarui inkremental saat data marketing ditambah."""
+    __tablename__ = "marketing_funnel_stats"
+    __table_args__ = (
+        db.UniqueConstraint("stage", "label", name="uq_marketing_funnel_stats_stage_label"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    stage = db.Column(db.String(20), nullable=False)  # prospect/lead/project/followup
+    label = db.Column(db.String(50), nullable=False, default="")
+    total = db.Column(db.Integer, nullable=False, default=0)
+    converted = db.Column(db.Integer, nullable=False, default=0)  # yang lanjut ke tahap berikut
+    value = db.Column(db.Float, nullable=False, default=0.0)
+    days_sum = db.Column(db.Float, nullable=False, default=0.0)  # lama sampai tahap berikut
+    days_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<FunnelStat {self.stage}/{self.label or '-'} {self.total}>"
+
 # ---------- MARKETING CLIENT BARU ----------
 class MarketingClient(db.Model):
     __tablename__ = "marketing_client"
@@ -183,4 +368,36 @@ class MarketingClient(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
-        return f"<Client {self.name} - {self.company}>"
\ No newline at end of file
+        return f"<Client {self.name} - {self.company}>"
+
+class MarketingNameKey(db.Model):
+    """Nama client/prospek yang sudah dinormalisasi (huruf kecil, tanpa tanda
+    baca & bentuk badan usaha) untuk deteksi duplikat; di-index trigram FTS5."""
+    __tablename__ = "marketing_name_keys"
+    __table_args__ = (
+        db.UniqueConstraint("kind", "ref_id", name="uq_marketing_name_keys_kind_ref"),
+        db.Index("ix_marketing_name_keys_company_key", "company_key"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)  # client / prospect
+    ref_id = db.Column(db.Integer, nullable=False)
+    company_key = db.Column(db.String(150), nullable=False, default="")
+    name_key = db.Column(db.String(150), nullable=False, default="")
+
+    def __repr__(self):
+        return f"<NameKey {self.kind}:{self.ref_id} {self.company_key or self.name_key}>"
+
+# ---------- LOKASI KANTOR / SITE ABSENSI ----------
+class OfficeSite(db.Model):
+    __tablename__ = "office_sites"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(150), nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    radius_m = db.Column(db.Float, nullable=False, default=5.0)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+
+    def __repr__(self):
+        return f"<OfficeSite {self.name} r={self.radius_m}m>"
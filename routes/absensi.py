@@ -1,13 +1,102 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
+from datetime import datetime
+from math import inf
+from models import db, OfficeSite
+from services import geofence_service
+from services.hrd_service import local_today
+from routes.uploads import upload_url
 from services.absensi_service import (
-    validate_location, already_checked, save_photo,
-    add_attendance, get_records_for_user
+    validate_location, already_checked, save_photo, add_attendance, checkin_writer,
+    get_records_for_user, make_photo_variants, photo_variant_name,
+    office_sites, day_bounds, rebuild_daily, backfill_employee_ids,
+    PAGE_SIZE, UPLOAD_FOLDER
 )
+import os
+import click
 
 absensi_bp = Blueprint("absensi", __name__, template_folder="../templates")
 
 
+@absensi_bp.app_template_filter("photo_url")
+def photo_url(filename, variant=None):
+    """URL foto absensi; variant 'thumb'/'display' atau None (asli)."""
+    name = photo_variant_name(filename, variant) if variant else filename
+    return upload_url(name, "absensi")
+
+
+@absensi_bp.cli.command("thumbnails")
+@click.option("--force", is_flag=True, help="Buat ulang walau thumbnail sudah ada.")
+def build_thumbnails(force):
+    """Buat thumbnail untuk foto absensi lama yang belum punya."""
+    done = 0
+    for entry in os.scandir(UPLOAD_FOLDER):
+        if not entry.is_file():
+            continue
+        thumb = os.path.join(UPLOAD_FOLDER, photo_variant_name(entry.name, "thumb"))
+        if force or not os.path.exists(thumb):
+            make_photo_variants(entry.name)
+            done += 1
+    click.echo(f"{done} foto diproses.")
+
+
+@absensi_bp.cli.command("add-site")
+@click.argument("name")
+@click.argument("latitude", type=float)
+@click.argument("longitude", type=float)
+@click.option("--radius", type=float, default=50.0, show_default=True, help="Radius (meter).")
+def add_site(name, latitude, longitude, radius):
+    """Daftarkan lokasi kantor / site proyek untuk absensi."""
+    db.session.add(OfficeSite(name=name, latitude=latitude, longitude=longitude, radius_m=radius))
+    db.session.commit()
+    click.echo(f"Site '{name}' ditambahkan (radius {radius:g} m).")
+
+
+@absensi_bp.cli.command("geofence-report")
+@click.option("--date", "day", type=click.DateTime(["%Y-%m-%d"]), default=None,
+              help="Tanggal (YYYY-MM-DD), default hari ini.")
+def geofence_report(day):
+    """Validasi ulang lokasi seluruh absensi satu hari, tampilkan anomali."""
+    day = day.date() if day else local_today()
+    anomalies = geofence_service.revalidate_day(*day_bounds(day))
+    for a in anomalies:
+        if a["latitude"] is None:
+            jarak = "tanpa lokasi"
+        elif a["distance_m"] is None:
+            jarak = "jauh dari semua site"
+        else:
+            jarak = f"{a['distance_m']} m dari site terdekat"
+        click.echo(f"{a['timestamp']:%H:%M}  {a['username']:<20} {a['status']:<10} {jarak}")
+    click.echo(f"{len(anomalies)} anomali pada {day:%d/%m/%Y}.")
+
+
+@absensi_bp.cli.command("rebuild-daily")
+@click.option("--from", "date_from", type=click.DateTime(["%Y-%m-%d"]), required=True)
+@click.option("--to", "date_to", type=click.DateTime(["%Y-%m-%d"]), default=None,
+              help="Default sama dengan --from.")
+def rebuild_daily_command(date_from, date_to):
+    """Bangun ulang rekap attendance_daily untuk rentang tanggal."""
+    date_to = date_to or date_from
+    total = rebuild_daily(date_from.date(), date_to.date())
+    click.echo(f"{total} baris rekap ditulis ({date_from:%d/%m/%Y} - {date_to:%d/%m/%Y}).")
+
+
+@absensi_bp.cli.command("backfill-employee")
+@click.option("--batch-size", default=5000, show_default=True)
+def backfill_employee_command(batch_size):
+    """Isi employee_id absensi lama dari relasi users -> employees."""
+    total = backfill_employee_ids(batch_size)
+    click.echo(f"{total} baris absensi diperbarui.")
+
+
+def _parse_date(value):
+    """Parse 'YYYY-MM-DD' dari query string, None bila kosong/invalid."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+    except ValueError:
+        return None
+
+
 @absensi_bp.route("/absensi", methods=["GET", "POST"])
 @login_required
 def absensi_page():
@@ -23,22 +112,71 @@ def absensi_page():
         lat, lon = float(lat_str), float(lon_str)
         valid, jarak = validate_location(lat, lon)
         if not valid:
-            flash(f"❌  Anda {jarak:.2f} m dari kantor (maks. 5 m).", "danger")
+            if jarak == inf:
+                flash("❌  Anda berada di luar area kantor mana pun.", "danger")
+            else:
+                flash(f"❌  Anda {jarak:.2f} m dari kantor terdekat, di luar radius absensi.", "danger")
             return redirect(url_for("absensi.absensi_page"))
 
-        # cek double absen
+        # cek double absen sebelum foto disimpan (satu lookup berindex); unique
+        # index tetap jadi penjaga terakhir bila dua request datang bersamaan
         if already_checked(current_user.username, status):
             flash(f"⚠️  Anda sudah melakukan absen {status} hari ini.", "warning")
             return redirect(url_for("absensi.absensi_page"))
 
         # simpan foto
-        filename = save_photo(request.files.get("photo"), current_user.username)
+        try:
+            filename = save_photo(request.files.get("photo"))
+        except ValueError as e:
+            flash(f"⚠️  {e}", "warning")
+            return redirect(url_for("absensi.absensi_page"))
+
+        # tambah record absensi — double absen ditolak oleh unique index
+        if current_app.config.get("ABSENSI_BURST_MODE"):
+            future = checkin_writer.submit(current_user.username, status, lat, lon, filename,
+                                           employee_id=current_user.employee_id)
+            try:
+                accepted = future.result(timeout=current_app.config["ABSENSI_BURST_TIMEOUT"])
+            except TimeoutError:
+                # belum ada putusan (bisa saja nanti ditolak sebagai duplikat)
+                flash(f"⏳  Absen {status} sedang diproses. Cek riwayat di bawah beberapa "
+                      "saat lagi untuk memastikan sudah tercatat.", "info")
+                return redirect(url_for("absensi.absensi_page"))
+            except Exception:
+                current_app.logger.exception("Gagal menulis absensi (mode burst)")
+                flash("❌  Absensi gagal disimpan, silakan coba lagi.", "danger")
+                return redirect(url_for("absensi.absensi_page"))
+        else:
+            accepted = add_attendance(current_user.username, status, lat, lon, filename,
+                                      employee_id=current_user.employee_id) is not None
 
-        # tambah record absensi
-        add_attendance(current_user.username, status, lat, lon, filename)
+        if not accepted:
+            flash(f"⚠️  Anda sudah melakukan absen {status} hari ini.", "warning")
+            return redirect(url_for("absensi.absensi_page"))
         flash("✅  Absensi berhasil direkam.", "success")
         return redirect(url_for("absensi.absensi_page"))
 
-    # tampilkan riwayat
-    records = get_records_for_user(current_user)
-    return render_template("absensi.html", records=records, user=current_user)
\ No newline at end of file
+    # tampilkan riwayat (per halaman, keyset cursor)
+    filters = {
+        "date_from": request.args.get("from", ""),
+        "date_to": request.args.get("to", ""),
+        "username": request.args.get("username", "").strip(),
+        "status": request.args.get("status", ""),
+    }
+    records, next_cursor = get_records_for_user(
+        current_user,
+        cursor=request.args.get("cursor"),
+        limit=request.args.get("limit", PAGE_SIZE, type=int),
+        date_from=_parse_date(filters["date_from"]),
+        date_to=_parse_date(filters["date_to"]),
+        username=filters["username"] or None,
+        status=filters["status"] or None,
+    )
+    return render_template(
+        "absensi.html",
+        records=records,
+        next_cursor=next_cursor,
+        filters=filters,
+        sites=office_sites() if current_user.role == "employee" else [],
+        user=current_user,
+    )
\ No newline at end of file
@@ -1,17 +1,25 @@
 from flask import (
     Blueprint, render_template, request, redirect,
-    url_for, flash, make_response
+    url_for, flash, jsonify, send_file, Response, stream_with_context, current_app
 )
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
-from weasyprint import HTML
 import os
+import json
+import click
 from datetime import datetime
 
 from services.accounting_service import (
-    get_summary, get_mutations, add_transaction
+    get_summary, get_mutations, mutations_page, recent_transactions, add_transaction,
+    reclose_periods, close_periods, explain_mutations, iter_ledger, LEDGER_COLUMNS,
+    import_statement_csv, run_statement_import
 )
-from models import Transaction
+from services.export_service import FORMATS as EXPORT_FORMATS, WRITERS
+from services.upload_service import save_upload
+from models import db, StatementImport
+from holycity import tasks
+from services.pdf_service import pdf_key, pdf_path, pdf_token, render_pdf
+from services.hrd_service import local_today
 
 accounting_bp = Blueprint(
     "accounting",
@@ -20,8 +28,48 @@ accounting_bp = Blueprint(
     template_folder="../templates/accounting"
 )
 
-UPLOAD_FOLDER = os.path.join("static", "uploads", "accounting")
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+# ============================================
+# CLI: SNAPSHOT SALDO
+# ============================================
+@accounting_bp.cli.command("close-periods")
+@click.option("--since", type=click.DateTime(["%Y-%m"]), default=None,
+              help="Hitung ulang dari ledger mulai bulan ini (YYYY-MM).")
+def close_periods_command(since):
+    """Tutup bulan-bulan yang belum ditutup; --since menutup ulang dari ledger."""
+    periods = reclose_periods(f"{since:%Y-%m}") if since else close_periods()
+    if not periods:
+        click.echo("Tidak ada bulan yang perlu ditutup.")
+        return
+    click.echo(f"{len(periods)} bulan ditutup: {', '.join(periods)}.")
+
+
+@accounting_bp.cli.command("import-statement")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--account", required=True, help="Nama akun/rekening, mis. BCA.")
+def import_statement_command(path, account):
+    """Import mutasi rekening dari file CSV bank."""
+    with open(path, encoding="utf-8-sig", newline="") as lines:
+        report = import_statement_csv(lines, account)
+    click.echo(f"{report['inserted']} transaksi diimport, {report['duplicates']} duplikat "
+               f"dilewati, {report['failed']} baris gagal.")
+    for line_num, message in report["errors"][:20]:
+        click.echo(f"  baris {line_num}: {message}")
+
+
+@accounting_bp.cli.command("explain-mutations")
+def explain_mutations_command():
+    """Cek EXPLAIN QUERY PLAN tiap mode mutasi; gagal bila ada full scan/sort."""
+    bad = []
+    for name, plan in explain_mutations().items():
+        click.echo(f"[{name}]")
+        for detail in plan:
+            click.echo(f"  {detail}")
+        if any(("SCAN" in d and "INDEX" not in d) or "TEMP B-TREE" in d for d in plan):
+            bad.append(name)
+    if bad:
+        raise click.ClickException(f"Mode tanpa index: {', '.join(bad)}")
+    click.echo("Semua mode mutasi memakai index.")
 
 
 # ============================================
@@ -34,7 +82,7 @@ def dashboard():
         return "Akses ditolak", 403
 
     summary = get_summary()
-    transactions = Transaction.query.order_by(Transaction.date.desc()).all()
+    transactions = recent_transactions()
     return render_template(
         "accounting/dashboard.html",
         user=current_user,
@@ -63,35 +111,138 @@ def add_txn():
     filename = None
 
     if file and file.filename:
-        safe_name = secure_filename(file.filename)
-        timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-        filename = f"{timestamp}_{safe_name}"
-        file.save(os.path.join(UPLOAD_FOLDER, filename))
+        try:
+            filename = save_upload(file, "accounting")
+        except ValueError as e:
+            flash(str(e), "warning")
+            return redirect(url_for("accounting.dashboard"))
 
     add_transaction(request.form, filename)
     flash("Transaksi berhasil ditambahkan.", "success")
     return redirect(url_for("accounting.dashboard"))
 
 
+# ============================================
+# IMPORT MUTASI REKENING (CSV BANK)
+# ============================================
+@accounting_bp.route("/import", methods=["POST"])
+@login_required
+def import_statement():
+    """Simpan file mutasi bank lalu import di latar belakang."""
+    if current_user.role not in ("admin", "hrd"):
+        return "Akses ditolak", 403
+
+    file = request.files.get("statement")
+    account = (request.form.get("account") or "").strip()
+    if not (file and file.filename and account):
+        flash("Pilih file CSV mutasi dan isi nama akun.", "warning")
+        return redirect(url_for("accounting.dashboard"))
+
+    job = StatementImport(filename=secure_filename(file.filename) or "mutasi.csv",
+                          account=account[:100])
+    db.session.add(job)
+    db.session.commit()
+
+    import_dir = current_app.config["IMPORT_DIR"]
+    os.makedirs(import_dir, exist_ok=True)
+    path = os.path.join(import_dir, f"{job.id}.csv")
+    file.save(path)
+    tasks.submit(run_statement_import, job.id, path)
+    return redirect(url_for("accounting.import_status", import_id=job.id))
+
+
+@accounting_bp.route("/import/<int:import_id>")
+@login_required
+def import_status(import_id):
+    """Laporan import mutasi; dimuat ulang otomatis selama masih diproses."""
+    if current_user.role not in ("admin", "hrd"):
+        return "Akses ditolak", 403
+
+    job = db.get_or_404(StatementImport, import_id)
+    return render_template(
+        "accounting/statement_import.html",
+        user=current_user,
+        job=job,
+        errors=json.loads(job.errors or "[]")
+    ), 202 if job.status == "pending" else 200
+
+
 # ============================================
 # MUTASI KEUANGAN
 # ============================================
+def _parse_date(value):
+    """Parse 'YYYY-MM-DD' dari form/query string, None bila kosong/invalid."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+    except ValueError:
+        return None
+
+
+def _mutation_filters(values):
+    """Filter rentang & kategori mutasi dari form atau query string."""
+    return {
+        "date_from": _parse_date(values.get("start_date")),
+        "date_to": _parse_date(values.get("end_date")),
+        "category": values.get("category") or None,
+    }
+
+
 @accounting_bp.route("/mutasi", methods=["GET", "POST"])
 @login_required
 def mutasi():
     if current_user.role not in ("admin", "hrd"):
         return "Akses ditolak", 403
 
+    # baris tabel diambil per halaman lewat mutasi_data (DataTables server-side)
     mode = request.form.get("mode", "all")
-    mutations = get_mutations(mode)
+    filters = {
+        "start_date": request.form.get("start_date", ""),
+        "end_date": request.form.get("end_date", ""),
+        "category": request.form.get("category", ""),
+    }
     return render_template(
         "accounting/mutasi.html",
         user=current_user,
-        mutations=mutations,
-        selected_mode=mode
+        selected_mode=mode,
+        filters=filters
     )
 
 
+@accounting_bp.route("/mutasi/data")
+@login_required
+def mutasi_data():
+    """Endpoint JSON protokol server-side DataTables untuk tabel mutasi."""
+    if current_user.role not in ("admin", "hrd"):
+        return jsonify({"error": "Akses ditolak"}), 403
+
+    args = request.args
+    total, filtered, rows = mutations_page(
+        args.get("mode", "all"),
+        start=args.get("start", 0, type=int),
+        length=args.get("length", 10, type=int),
+        search=args.get("search[value]"),
+        order_column=args.get("order[0][column]", 0, type=int),
+        order_dir=args.get("order[0][dir]", "desc"),
+        **_mutation_filters(args),
+    )
+    return jsonify({
+        "draw": args.get("draw", 0, type=int),
+        "recordsTotal": total,
+        "recordsFiltered": filtered,
+        "data": [
+            {
+                "date": m.date.strftime("%d/%m/%Y") if m.date else "-",
+                "category": m.category,
+                "description": m.description or "-",
+                "source": m.source or "-",
+                "account": m.account or "-",
+                "amount": m.amount or 0.0,
+            }
+            for m in rows
+        ],
+    })
+
+
 # ============================================
 # EXPORT PDF
 # ============================================
@@ -101,16 +252,45 @@ def export_mutasi_pdf(mode):
     if current_user.role not in ("admin", "hrd"):
         return "Akses ditolak", 403
 
-    mutations = get_mutations(mode)
-    today = datetime.utcnow().date()
-    html = render_template(
-        "accounting/mutasi_pdf.html",
-        mutations=mutations,
-        mode=mode,
-        today=today
+    filters = _mutation_filters(request.args)
+    today = local_today()
+    key = pdf_key("accounting/mutasi_pdf.html", {"mode": mode, "today": today, **filters},
+                  tables=("transactions",))
+
+    def render_html():
+        return render_template(
+            "accounting/mutasi_pdf.html",
+            mutations=get_mutations(mode, **filters),
+            mode=mode,
+            today=today,
+            filters=filters
+        )
+
+    # PDF kecil/sudah di-cache langsung dikirim; yang besar lanjut di latar
+    filename = f"mutasi_{mode}.pdf"
+    if render_pdf(key, render_html) == "done":
+        return send_file(pdf_path(key), mimetype="application/pdf", download_name=filename)
+    return redirect(url_for("pdf.pdf_download", token=pdf_token(key, roles=("admin", "hrd")),
+                            name=filename, back=url_for("accounting.mutasi")))
+
+
+# ============================================
+# EXPORT CSV / XLSX (STREAMING)
+# ============================================
+@accounting_bp.route("/mutasi/export/<fmt>/<mode>")
+@login_required
+def export_mutasi(fmt, mode):
+    """Unduh ledger mentah sebagai CSV/XLSX, ditulis per potongan."""
+    if current_user.role not in ("admin", "hrd"):
+        return "Akses ditolak", 403
+    if fmt not in WRITERS:
+        return "Format tidak dikenal", 404
+
+    rows = iter_ledger(mode, **_mutation_filters(request.args))
+    body = WRITERS[fmt](LEDGER_COLUMNS, rows)
+    filename = f"mutasi_{mode}_{local_today():%Y%m%d}.{fmt}"
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
     )
-    pdf = HTML(string=html).write_pdf()
-    response = make_response(pdf)
-    response.headers["Content-Type"] = "application/pdf"
-    response.headers["Content-Disposition"] = f"inline; filename=mutasi_{mode}.pdf"
-    return response
\ No newline at end of file
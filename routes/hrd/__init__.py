@@ -15,7 +15,7 @@ hrd_bp = Blueprint(
     template_folder=TEMPLATE_DIR
 )
 
-# Impor semua modul HRD (dashboard, employee, performance)
-from . import dashboard, employee, performance
+# Impor semua modul HRD (dashboard, employee, performance, report, payroll)
+from . import dashboard, employee, performance, report, payroll
 
 __all__ = ["hrd_bp"]
\ No newline at end of file
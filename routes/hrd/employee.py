@@ -1,9 +1,15 @@
 # routes/hrd/employee.py
-from flask import render_template, request, redirect, url_for, flash
+from flask import render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from werkzeug.exceptions import abort
 from datetime import datetime
+import io
+import click
 from models import db, Employee
+from services.hrd_service import (
+    list_employees, typeahead_employees, parse_employee_fields, import_employees_csv,
+    delete_employee, archive_employee
+)
 from . import hrd_bp
 
 
@@ -17,14 +23,34 @@ def employee_list():
     if current_user.role not in ("hrd", "admin"):
         return "Akses ditolak", 403
 
-    employees = Employee.query.order_by(Employee.name.asc()).all()
+    q = request.args.get("q", "").strip()
+    archived = request.args.get("archived") == "1"
+    pagination = list_employees(q, page=request.args.get("page", 1, type=int),
+                                include_archived=archived)
     return render_template(
         "hrd/employee_list.html",
         user=current_user,
-        employees=employees,
+        employees=pagination.items,
+        pagination=pagination,
+        q=q,
+        archived=archived,
     )
 
 
+# ==========================
+# 🔹 Cari Karyawan (typeahead JSON)
+# ==========================
+@hrd_bp.route("/employees/search")
+@login_required
+def employee_search():
+    """Kandidat karyawan untuk form pemilih, dicari per prefix kata."""
+    if current_user.role not in ("hrd", "admin"):
+        return jsonify([]), 403
+
+    q = request.args.get("q", "").strip()
+    return jsonify(typeahead_employees(q) if q else [])
+
+
 # ==========================
 # 🔹 Tambah Karyawan
 # ==========================
@@ -35,29 +61,56 @@ def employee_add():
     if current_user.role not in ("admin", "hrd"):
         abort(403)
 
-    name = request.form.get("name")
-    dept = request.form.get("department")
-    pos = request.form.get("position")
-    join_date = request.form.get("join_date")
-    salary = request.form.get("salary")
-
-    if not name:
-        flash("Nama karyawan harus diisi.", "warning")
+    try:
+        values = parse_employee_fields(request.form)
+    except ValueError as e:
+        flash(str(e), "warning")
         return redirect(url_for("hrd.employee_list"))
 
-    new_emp = Employee(
-        name=name,
-        department=dept,
-        position=pos,
-        join_date=datetime.strptime(join_date, "%Y-%m-%d") if join_date else None,
-        salary=float(salary) if salary else 0.0,
-    )
+    new_emp = Employee(**values)
     db.session.add(new_emp)
     db.session.commit()
-    flash(f"Karyawan '{name}' berhasil ditambahkan.", "success")
+    flash(f"Karyawan '{new_emp.name}' berhasil ditambahkan.", "success")
     return redirect(url_for("hrd.employee_list"))
 
 
+# ==========================
+# 🔹 Import Karyawan (CSV)
+# ==========================
+@hrd_bp.route("/employee/import", methods=["POST"])
+@login_required
+def employee_import():
+    """Import massal karyawan dari file CSV, tampilkan laporan per baris"""
+    if current_user.role not in ("admin", "hrd"):
+        abort(403)
+
+    file = request.files.get("file")
+    if not file or not file.filename:
+        flash("Pilih file CSV terlebih dahulu.", "warning")
+        return redirect(url_for("hrd.employee_list"))
+
+    # dibaca per baris langsung dari stream upload, tidak dimuat utuh ke memori
+    lines = io.TextIOWrapper(file.stream, encoding="utf-8-sig", newline="")
+    report = import_employees_csv(lines)
+    return render_template(
+        "hrd/employee_import.html",
+        user=current_user,
+        filename=file.filename,
+        report=report,
+    )
+
+
+@hrd_bp.cli.command("import-employees")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def import_employees_command(path):
+    """Import massal karyawan dari file CSV."""
+    with open(path, encoding="utf-8-sig", newline="") as lines:
+        report = import_employees_csv(lines)
+    for line_num, message in report["errors"]:
+        click.echo(f"baris {line_num}: {message}", err=True)
+    click.echo(f"{report['inserted']} karyawan diimport, {report['failed']} baris gagal.")
+
+
 # ==========================
 # 🔹 Update Karyawan
 # ==========================
@@ -95,7 +148,31 @@ def employee_delete(emp_id):
         abort(403)
 
     emp = Employee.query.get_or_404(emp_id)
-    db.session.delete(emp)
-    db.session.commit()
-    flash(f"Karyawan '{emp.name}' telah dihapus.", "info")
-    return redirect(url_for("hrd.employee_list"))
\ No newline at end of file
+    name = emp.name
+    try:
+        delete_employee(emp.id)
+    except ValueError as e:
+        flash(f"Karyawan '{name}' tidak dihapus: {e}", "warning")
+        return redirect(url_for("hrd.employee_list"))
+    flash(f"Karyawan '{name}' telah dihapus.", "info")
+    return redirect(url_for("hrd.employee_list"))
+
+
+# ==========================
+# 🔹 Arsip Karyawan (soft-delete)
+# ==========================
+@hrd_bp.route("/employee/archive/<int:emp_id>", methods=["POST"])
+@login_required
+def employee_archive(emp_id):
+    """Arsipkan / pulihkan karyawan tanpa menghapus riwayatnya"""
+    if current_user.role not in ("admin", "hrd"):
+        abort(403)
+
+    emp = Employee.query.get_or_404(emp_id)
+    restore = request.form.get("restore") == "1"
+    archive_employee(emp, archived=not restore)
+    if restore:
+        flash(f"Karyawan '{emp.name}' dipulihkan dari arsip.", "success")
+    else:
+        flash(f"Karyawan '{emp.name}' diarsipkan.", "info")
+    return redirect(url_for("hrd.employee_list", archived=1 if restore else None))
@@ -0,0 +1,17 @@
+# routes/hrd/payroll.py
+import click
+from services.hrd_service import run_payroll
+from . import hrd_bp
+
+
+@hrd_bp.cli.command("payroll")
+@click.argument("period", type=click.DateTime(["%Y-%m"]))
+@click.option("--workers", type=int, default=None, help="Jumlah proses paralel.")
+@click.option("--force", is_flag=True, help="Hitung ulang periode yang sudah ditutup.")
+def payroll_command(period, workers, force):
+    """Hitung & tutup payroll bulanan (PERIOD = YYYY-MM)."""
+    run = run_payroll(f"{period:%Y-%m}", workers=workers, force=force)
+    click.echo(
+        f"Payroll {run.period}: {run.employee_count} karyawan, "
+        f"{run.working_days} hari kerja, total Rp {run.total_net:,.0f}."
+    )
@@ -1,9 +1,10 @@
 # routes/hrd/performance.py
-from flask import render_template, request, redirect, url_for, flash
+from flask import render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from werkzeug.exceptions import abort
 from datetime import datetime
 from models import db, Employee, Performance
+from services.hrd_service import performance_analytics, performance_trend
 from . import hrd_bp
 
 
@@ -26,12 +27,10 @@ def performance_list():
         .order_by(Performance.period.desc())
         .all()
     )
-    employees = Employee.query.order_by(Employee.name.asc()).all()
     return render_template(
         "hrd/performance.html",
         user=current_user,
-        records=records,
-        employees=employees
+        records=records
     )
 
 
@@ -63,4 +62,36 @@ def performance_add():
     db.session.commit()
 
     flash("Data penilaian kinerja berhasil ditambahkan.", "success")
-    return redirect(url_for("hrd.performance_list"))
\ No newline at end of file
+    return redirect(url_for("hrd.performance_list"))
+
+
+@hrd_bp.route("/performance/analytics")
+@login_required
+def performance_analytics_view():
+    """Peringkat, persentil & tren kinerja per periode."""
+    if current_user.role not in ("admin", "hrd"):
+        abort(403)
+
+    periods = [
+        p for (p,) in db.session.query(Performance.period)
+        .distinct().order_by(Performance.period.desc()).all()
+    ]
+    period = request.args.get("period") or (periods[0] if periods else None)
+    rows = performance_analytics(period) if period else []
+    return render_template(
+        "hrd/performance_analytics.html",
+        user=current_user,
+        periods=periods,
+        period=period,
+        rows=rows
+    )
+
+
+@hrd_bp.route("/performance/trend/<int:emp_id>")
+@login_required
+def performance_trend_json(emp_id):
+    """Deret tren kinerja satu karyawan (JSON)."""
+    if current_user.role not in ("admin", "hrd"):
+        abort(403)
+
+    return jsonify(performance_trend(emp_id))
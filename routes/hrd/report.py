@@ -1,5 +1,62 @@
+# routes/hrd/report.py
+from datetime import date, datetime
+from flask import render_template, request, make_response
+from flask_login import login_required, current_user
+from werkzeug.exceptions import abort
+from services.report_service import REPORTS, FORMATS, request_report
 from . import hrd_bp
 
+
 @hrd_bp.route("/report")
-def report_placeholder():
-    return "Halaman Report (belum dikembangkan)"
\ No newline at end of file
+@login_required
+def report_index():
+    """Daftar laporan HRD + form parameter."""
+    if current_user.role not in ("admin", "hrd"):
+        abort(403)
+
+    return render_template(
+        "hrd/report.html",
+        user=current_user,
+        reports=REPORTS,
+        default_month=date.today().strftime("%Y-%m"),
+        result=None,
+    )
+
+
+@hrd_bp.route("/report/<name>")
+@login_required
+def report_view(name):
+    """Tampilkan laporan dari cache, atau antrikan pembuatannya."""
+    if current_user.role not in ("admin", "hrd"):
+        abort(403)
+    if name not in REPORTS:
+        abort(404)
+
+    spec = REPORTS[name]
+    value = request.args.get(spec["param"], "")
+    fmt = request.args.get("format", "html")
+    if fmt not in FORMATS:
+        abort(400)
+    try:
+        # bulan harus valid (2026-13 ditolak); dinormalisasi agar key cache konsisten
+        value = datetime.strptime(value, "%Y-%m").strftime("%Y-%m")
+    except ValueError:
+        abort(400)
+
+    result = request_report(name, {spec["param"]: value}, fmt,
+                            retry=request.args.get("retry") == "1")
+    if result.status == "done":
+        resp = make_response(result.content)
+        resp.headers["Content-Type"] = FORMATS[fmt]
+        if fmt != "html":
+            resp.headers["Content-Disposition"] = f"attachment; filename={name}_{value}.{fmt}"
+        return resp
+
+    return render_template(
+        "hrd/report.html",
+        user=current_user,
+        reports=REPORTS,
+        default_month=value,
+        result=result,
+        spec=spec,
+    ), 202
@@ -0,0 +1,41 @@
+# routes/pdf.py
+"""Halaman "sedang disiapkan" & unduhan untuk PDF yang dirender di latar."""
+import re
+from flask import Blueprint, render_template, request, send_file
+from flask_login import login_required, current_user
+from werkzeug.exceptions import abort
+from services.pdf_service import pdf_status, pdf_path, read_pdf_token
+
+pdf_bp = Blueprint("pdf", __name__, url_prefix="/pdf")
+
+
+@pdf_bp.route("/<token>")
+@login_required
+def pdf_download(token):
+    """Kirim PDF bila sudah jadi; selama dibuat tampilkan halaman tunggu (202)."""
+    key, roles = read_pdf_token(token)
+    if key is None or not re.fullmatch(r"[0-9a-f]{64}", key):
+        abort(404)
+    if roles and current_user.role not in roles:
+        abort(403)
+
+    name = re.sub(r"[^\w.-]", "_", request.args.get("name", "dokumen.pdf"))
+    status, error = pdf_status(key)
+    if status is None:
+        abort(404)
+    if status == "done":
+        return send_file(pdf_path(key), mimetype="application/pdf", download_name=name)
+
+    return render_template(
+        "pdf_pending.html",
+        user=current_user,
+        status=status,
+        error=error,
+        name=name,
+        back=_local_url(request.args.get("back")),
+    ), 202
+
+
+def _local_url(url):
+    """Hanya izinkan tautan kembali ke path aplikasi ini."""
+    return url if url and url.startswith("/") and not url.startswith("//") else None
@@ -0,0 +1,31 @@
+# routes/uploads.py
+"""Penyajian file dari upload store (content-addressed) dengan cache immutable."""
+from flask import Blueprint, current_app, send_from_directory, url_for
+from flask_login import login_required
+from werkzeug.exceptions import abort
+from services.upload_service import NAMESPACES, is_stored_name, store_root
+
+uploads_bp = Blueprint("uploads", __name__, url_prefix="/uploads")
+
+
+@uploads_bp.app_template_filter("upload_url")
+def upload_url(name, namespace):
+    """URL file upload: nama content-addressed lewat store, nama lama
+    (sebelum store ada) tetap dari static/uploads/<namespace>/."""
+    if is_stored_name(name):
+        return url_for("uploads.serve_upload", namespace=namespace, name=name)
+    return url_for("static", filename=f"uploads/{namespace}/{name}")
+
+
+@uploads_bp.route("/<namespace>/<path:name>")
+@login_required
+def serve_upload(namespace, name):
+    # nama = hash isi: isi di balik URL ini tidak pernah berubah
+    if namespace not in NAMESPACES or not is_stored_name(name):
+        abort(404)
+    response = send_from_directory(store_root(namespace), name,
+                                   max_age=current_app.config["UPLOAD_CACHE_MAX_AGE"])
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
@@ -1,16 +1,37 @@
 # services/absensi_service.py
-from datetime import datetime, date
+from concurrent.futures import Future
+from datetime import datetime, date, time, timedelta
 from math import radians, sin, cos, sqrt, atan2
-from models import db, Attendance
-from werkzeug.utils import secure_filename
+from time import monotonic
+from flask import current_app
+from sqlalchemy import tuple_, case, func, update
+from sqlalchemy.exc import IntegrityError
+from PIL import Image, ImageOps
+from models import db, Attendance, AttendanceDaily, User
+from holycity import tasks
+from services import geofence_service, upload_service
+from services.hrd_service import (
+    LOCAL_DATE_MODIFIER, PAYROLL_UTC_OFFSET, invalidate_dashboard_counts, local_day, local_today
+)
 import os
+import queue
+import threading
 
-# --- konfigurasi lokasi kantor ---
+# --- lokasi kantor default (dipakai bila tabel office_sites masih kosong) ---
 OFFICE_LAT = -6.914744
 OFFICE_LON = 107.609810
 ALLOWED_RADIUS = 5  # meter
 UPLOAD_FOLDER = os.path.join("static", "uploads", "absensi")
+PAGE_SIZE = 50       # baris riwayat per halaman
+MAX_PAGE_SIZE = 200  # batas atas ?limit= dari query string
+# turunan foto: thumbnail untuk tabel riwayat, versi tampilan berukuran terbatas
+PHOTO_VARIANTS = {
+    "thumb": {"size": (96, 96), "format": "WEBP", "ext": "webp", "quality": 70},
+    "display": {"size": (1280, 1280), "format": "JPEG", "ext": "jpg", "quality": 80},
+}
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+for _variant in PHOTO_VARIANTS:
+    os.makedirs(os.path.join(UPLOAD_FOLDER, _variant), exist_ok=True)
 
 
 # === Utility ===
@@ -24,56 +45,394 @@ def distance_m(lat1, lon1, lat2, lon2):
     return R * c
 
 
+def day_bounds(day):
+    """Rentang setengah-terbuka [awal hari, awal hari berikutnya) hari WIB,
+    dalam UTC seperti kolom timestamp, untuk filter yang tetap bisa memakai
+    index (tanpa func.date di kolom)."""
+    start = datetime.combine(day, time.min) - PAYROLL_UTC_OFFSET
+    return start, start + timedelta(days=1)
+
+
 # === Service utama ===
 def validate_location(lat, lon):
-    """Pastikan user berada dalam radius kantor."""
-    jarak = distance_m(lat, lon, OFFICE_LAT, OFFICE_LON)
-    return jarak <= ALLOWED_RADIUS, jarak
+    """Pastikan user berada dalam radius salah satu site kantor.
+    Return (valid, jarak ke site terdekat yang dievaluasi)."""
+    index = geofence_service.get_index()
+    if not index:
+        jarak = distance_m(lat, lon, OFFICE_LAT, OFFICE_LON)
+        return jarak <= ALLOWED_RADIUS, jarak
+    site, jarak = geofence_service.match_site(lat, lon, index)
+    return site is not None, jarak
+
+
+def office_sites():
+    """Site aktif untuk cek radius di browser (fallback: kantor default)."""
+    return geofence_service.get_sites() or [
+        {"name": "Kantor", "lat": OFFICE_LAT, "lng": OFFICE_LON, "radius": ALLOWED_RADIUS}
+    ]
 
 
 def already_checked(username, status):
-    """Cek apakah user sudah absen status sama hari ini."""
-    today = date.today()
+    """Cek apakah user sudah absen status sama hari ini (WIB)."""
     record = Attendance.query.filter(
         Attendance.username == username,
-        db.func.date(Attendance.timestamp) == today,
-        Attendance.status == status
+        Attendance.status == status,
+        Attendance.day == local_today()
     ).first()
     return bool(record)
 
 
-def save_photo(file, username):
-    """Simpan foto ke folder upload, return filename."""
+def photo_variant_name(filename, variant):
+    """Nama file turunan (relatif ke folder foto) untuk foto asli."""
+    stem = os.path.splitext(filename)[0]
+    return f"{variant}/{stem}.{PHOTO_VARIANTS[variant]['ext']}"
+
+
+def photo_root(filename):
+    """Folder foto: upload store untuk nama content-addressed, UPLOAD_FOLDER
+    untuk foto lama."""
+    if upload_service.is_stored_name(filename):
+        return upload_service.store_root("absensi")
+    return UPLOAD_FOLDER
+
+
+def make_photo_variants(filename, force=True):
+    """Buat thumbnail & versi tampilan dari foto asli (dijalankan di latar)."""
+    root = photo_root(filename)
+    src = os.path.join(root, filename)
+    targets = {v: os.path.join(root, photo_variant_name(filename, v)) for v in PHOTO_VARIANTS}
+    if not force and all(os.path.exists(t) for t in targets.values()):
+        return  # foto identik sudah pernah diupload
+    try:
+        with Image.open(src) as img:
+            # decode JPEG langsung di resolusi kecil bila memungkinkan
+            img.draft("RGB", PHOTO_VARIANTS["display"]["size"])
+            img = ImageOps.exif_transpose(img).convert("RGB")
+            for variant, spec in PHOTO_VARIANTS.items():
+                out = img.copy()
+                out.thumbnail(spec["size"], Image.Resampling.LANCZOS)
+                os.makedirs(os.path.dirname(targets[variant]), exist_ok=True)
+                out.save(
+                    targets[variant],
+                    spec["format"],
+                    quality=spec["quality"],
+                    optimize=True,
+                )
+    except (OSError, Image.DecompressionBombError):
+        current_app.logger.exception("Gagal membuat thumbnail absensi: %s", filename)
+
+
+def save_photo(file):
+    """Simpan foto ke upload store (streaming + dedupe), thumbnail dibuat di
+    latar. Return nama file, None bila tidak ada foto; ValueError bila
+    tipe/ukuran ditolak."""
     if not file or not file.filename:
         return None
-    safe_name = secure_filename(file.filename)
-    timestamp_str = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    filename = f"{username}_{timestamp_str}_{safe_name}"
-    path = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(path)
+    filename = upload_service.save_upload(file, "absensi")
+    tasks.submit(make_photo_variants, filename, force=False)
     return filename
 
 
-def add_attendance(username, status, lat, lon, photo_filename=None):
-    """Tambah record absensi ke database."""
-    record = Attendance(
+def _new_attendance(username, status, lat, lon, photo_filename=None, employee_id=None):
+    now = datetime.utcnow()
+    return Attendance(
         username=username,
+        employee_id=employee_id,
         status=status,
         latitude=lat,
         longitude=lon,
         photo=photo_filename,
-        timestamp=datetime.utcnow()
+        timestamp=now,
+        day=local_day(now),  # hari WIB dari timestamp yang sama
     )
+
+
+def add_attendance(username, status, lat, lon, photo_filename=None, employee_id=None):
+    """Tambah record absensi ke database.
+
+    employee_id (kunci integer karyawan) disimpan agar laporan HR cukup
+    join ke employees tanpa mencocokkan username.
+
+    Return None bila user sudah absen dengan status sama hari ini — dijaga
+    unique index (username, status, day), bukan cek-lalu-tulis.
+    """
+    record = _new_attendance(username, status, lat, lon, photo_filename, employee_id)
     db.session.add(record)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    refresh_daily({(record.username, record.day)})
     db.session.commit()
     return record
 
 
-def get_records_for_user(user):
-    """Ambil data absensi tergantung role."""
-    if user.role in ("admin", "hrd"):
-        return Attendance.query.order_by(Attendance.timestamp.desc()).all()
-    return (Attendance.query
-            .filter_by(username=user.username)
-            .order_by(Attendance.timestamp.desc())
-            .all())
\ No newline at end of file
+def add_attendance_batch(items):
+    """Tulis banyak absensi (list of dict argumen add_attendance) dalam satu
+    transaksi. Return list bool sejajar items: True bila diterima."""
+    records = [_new_attendance(**item) for item in items]
+
+    # satu query berindex untuk seluruh batch: absen yang sudah tersimpan hari ini
+    seen = set(
+        db.session.query(Attendance.username, Attendance.status, Attendance.day)
+        .filter(Attendance.username.in_({r.username for r in records}),
+                Attendance.day.in_({r.day for r in records}))
+        .all()
+    )
+    for i, record in enumerate(records):
+        key = (record.username, record.status, record.day)
+        # duplikat (dengan data lama atau di dalam batch) langsung ditolak
+        if key in seen:
+            records[i] = None
+        seen.add(key)
+
+    db.session.add_all([r for r in records if r is not None])
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # ditulis bersamaan oleh proses lain: ulangi per baris pakai savepoint
+        db.session.rollback()
+        for i, record in enumerate(records):
+            if record is None:
+                continue
+            try:
+                with db.session.begin_nested():
+                    db.session.add(record)
+            except IntegrityError:
+                records[i] = None
+    refresh_daily({(r.username, r.day) for r in records if r is not None})
+    db.session.commit()
+    return [r is not None for r in records]
+
+
+# === Rekap harian (attendance_daily) ===
+def _aggregate_daily(*filters):
+    """Agregasi absensi mentah per (username, tanggal WIB) dalam satu GROUP BY."""
+    day_col = func.date(Attendance.timestamp, LOCAL_DATE_MODIFIER)
+    return (db.session.query(
+                Attendance.username,
+                day_col,
+                func.max(Attendance.employee_id),
+                func.min(case((Attendance.status == "Masuk", Attendance.timestamp))),
+                func.max(case((Attendance.status == "Keluar", Attendance.timestamp))),
+                func.max(case((Attendance.status != "Izin", 1), else_=0)),
+            )
+            .filter(*filters)
+            .group_by(Attendance.username, day_col)
+            .all())
+
+
+def _daily_values(employee_id, first_in, last_out, present):
+    minutes = 0
+    if first_in and last_out and last_out > first_in:
+        minutes = int((last_out - first_in).total_seconds() // 60)
+    return {
+        "employee_id": employee_id,
+        "first_in": first_in,
+        "last_out": last_out,
+        "status": "Hadir" if present else "Izin",
+        "minutes_worked": minutes,
+    }
+
+
+def refresh_daily(keys):
+    """Hitung ulang baris attendance_daily untuk set (username, tanggal).
+
+    Dipanggil di transaksi yang sama dengan penulisan absensi (tanpa commit);
+    hanya baris mentah milik user & hari tersebut yang dibaca.
+    """
+    by_day = {}
+    for username, day in keys:
+        by_day.setdefault(day, set()).add(username)
+
+    for day, usernames in by_day.items():
+        start, end = day_bounds(day)
+        aggregates = _aggregate_daily(Attendance.username.in_(usernames),
+                                      Attendance.timestamp >= start,
+                                      Attendance.timestamp < end)
+        existing = {
+            d.username: d
+            for d in AttendanceDaily.query.filter(AttendanceDaily.day == day,
+                                                  AttendanceDaily.username.in_(usernames))
+        }
+        for username, _, employee_id, first_in, last_out, present in aggregates:
+            values = _daily_values(employee_id, first_in, last_out, present)
+            row = existing.get(username)
+            if row is None:
+                db.session.add(AttendanceDaily(username=username, day=day, **values))
+            else:
+                for key, value in values.items():
+                    setattr(row, key, value)
+
+
+def rebuild_daily(date_from, date_to, chunk_size=1000):
+    """Bangun ulang attendance_daily untuk rentang tanggal (inklusif).
+    Return jumlah baris rekap yang ditulis."""
+    AttendanceDaily.query.filter(AttendanceDaily.day >= date_from,
+                                 AttendanceDaily.day <= date_to).delete()
+    aggregates = _aggregate_daily(Attendance.timestamp >= day_bounds(date_from)[0],
+                                  Attendance.timestamp < day_bounds(date_to)[1])
+    rows = [
+        {"username": username, "day": date.fromisoformat(day),
+         **_daily_values(employee_id, first_in, last_out, present)}
+        for username, day, employee_id, first_in, last_out, present in aggregates
+    ]
+    for i in range(0, len(rows), chunk_size):
+        db.session.execute(AttendanceDaily.__table__.insert(), rows[i:i + chunk_size])
+    db.session.commit()
+    invalidate_dashboard_counts()  # insert massal tidak memicu event ORM
+    return len(rows)
+
+
+def backfill_employee_ids(batch_size=5000):
+    """Isi attendance.employee_id yang kosong dari users.employee_id, per
+    rentang id agar transaksi tulis tetap pendek. Rekap harian ikut diisi.
+    Return jumlah baris absensi yang diperbarui."""
+    employee_of = (db.session.query(User.employee_id)
+                   .filter(User.username == Attendance.username)
+                   .scalar_subquery())
+    max_id = db.session.query(func.max(Attendance.id)).scalar() or 0
+    total = 0
+    for lo in range(0, max_id, batch_size):
+        result = db.session.execute(
+            update(Attendance)
+            .where(Attendance.id > lo, Attendance.id <= lo + batch_size,
+                   Attendance.employee_id.is_(None))
+            .values(employee_id=employee_of)
+            .execution_options(synchronize_session=False)
+        )
+        total += result.rowcount
+        db.session.commit()
+
+    daily_employee_of = (db.session.query(User.employee_id)
+                         .filter(User.username == AttendanceDaily.username)
+                         .scalar_subquery())
+    db.session.execute(
+        update(AttendanceDaily)
+        .where(AttendanceDaily.employee_id.is_(None))
+        .values(employee_id=daily_employee_of)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return total
+
+
+class CheckinWriter:
+    """Penulis tunggal untuk mode burst absensi pagi.
+
+    Request hanya memvalidasi lalu memasukkan check-in ke antrian; satu thread
+    menulisnya per batch kecil (group commit), sehingga SQLite tidak
+    melayani ratusan transaksi tulis yang saling menunggu.
+    """
+
+    def __init__(self, batch_size=100, max_wait=0.0):
+        self.batch_size = batch_size
+        self.max_wait = max_wait  # detik menunggu batch terisi
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, username, status, lat, lon, photo_filename=None, employee_id=None):
+        """Antrikan check-in. Return Future berisi True/False (diterima/duplikat)."""
+        self._ensure_started(current_app._get_current_object())
+        future = Future()
+        self._queue.put((future, {
+            "username": username,
+            "status": status,
+            "lat": lat,
+            "lon": lon,
+            "photo_filename": photo_filename,
+            "employee_id": employee_id,
+        }))
+        return future
+
+    def _ensure_started(self, app):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, args=(app,), name="absensi-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self):
+        # group commit: ambil semua yang sudah antri selama batch sebelumnya
+        # ditulis; max_wait > 0 menunggu sebentar agar batch lebih penuh
+        batch = [self._queue.get()]
+        deadline = monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            try:
+                remaining = deadline - monotonic()
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, app):
+        while True:
+            batch = self._next_batch()
+            with app.app_context():
+                try:
+                    results = add_attendance_batch([item for _, item in batch])
+                except Exception as e:
+                    db.session.rollback()
+                    for future, _ in batch:
+                        future.set_exception(e)
+                    continue
+            for (future, _), accepted in zip(batch, results):
+                future.set_result(accepted)
+
+
+checkin_writer = CheckinWriter()
+
+
+def encode_cursor(record):
+    """Bentuk cursor keyset '<timestamp iso>_<id>' dari record terakhir."""
+    return f"{record.timestamp.isoformat()}_{record.id}"
+
+
+def decode_cursor(cursor):
+    """Kebalikan encode_cursor, return (timestamp, id) atau None bila rusak."""
+    try:
+        ts_str, id_str = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(ts_str), int(id_str)
+    except (AttributeError, ValueError):
+        return None
+
+
+def get_records_for_user(user, cursor=None, limit=PAGE_SIZE, date_from=None,
+                         date_to=None, username=None, status=None):
+    """Ambil satu halaman riwayat absensi (keyset pada timestamp, id).
+
+    Employee hanya melihat datanya sendiri; admin/hrd boleh memfilter
+    username. Return (records, next_cursor) — next_cursor None di halaman
+    terakhir.
+    """
+    limit = max(1, min(int(limit or PAGE_SIZE), MAX_PAGE_SIZE))
+    query = Attendance.query
+
+    if user.role not in ("admin", "hrd"):
+        query = query.filter(Attendance.username == user.username)
+    elif username:
+        query = query.filter(Attendance.username == username)
+
+    if status:
+        query = query.filter(Attendance.status == status)
+    if date_from:
+        query = query.filter(Attendance.timestamp >= day_bounds(date_from)[0])
+    if date_to:
+        query = query.filter(Attendance.timestamp < day_bounds(date_to)[1])
+
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        query = query.filter(tuple_(Attendance.timestamp, Attendance.id) < position)
+
+    rows = (query
+            .order_by(Attendance.timestamp.desc(), Attendance.id.desc())
+            .limit(limit + 1)
+            .all())
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
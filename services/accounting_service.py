@@ -1,50 +1,327 @@
 # services/accounting_service.py
-from datetime import datetime
-from sqlalchemy import func, case
+import csv
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, case, update, delete, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from holycity.extensions import db
-from models import Transaction
+from models import Transaction, AccountBalance, StatementImport
+from services.hrd_service import local_today
 
-def get_summary():
-    """Hitung saldo, pendapatan, pengeluaran bulan berjalan."""
+
+# === Snapshot saldo per akun per bulan ===
+def _period_of(day):
+    return f"{day:%Y-%m}"
+
+
+def _period_bounds(period):
+    """Rentang tanggal setengah terbuka [awal bulan, awal bulan berikut)."""
+    year, month = (int(part) for part in period.split("-"))
+    return date(year, month, 1), date(year + month // 12, month % 12 + 1, 1)
+
+
+def _deltas(category, amount):
+    income = amount if category == "income" else 0.0
+    expense = amount if category == "expense" else 0.0
+    net = amount if category == "income" else -amount
+    return income, expense, net
+
+
+def _apply_to_snapshot(txn):
+    """Tambahkan satu transaksi ke baris terbuka (akun, bulan)-nya."""
+    _apply_deltas({(txn.account or "", _period_of(txn.date)):
+                   _deltas(txn.category, txn.amount or 0.0)})
+
+
+def _apply_deltas(deltas):
+    """Tambahkan delta {(akun, bulan): (income, expense, net)} ke baris terbuka.
+
+    Transaksi mundur ke bulan yang sudah ditutup membuka kembali bulan itu
+    dan sesudahnya; penutupan berikutnya menghitung ulang dari ledger.
+    """
+    if not deltas:
+        return
+    db.session.execute(
+        update(AccountBalance)
+        .where(AccountBalance.period >= min(period for _, period in deltas),
+               AccountBalance.closed_at.isnot(None))
+        .values(closed_at=None, closing_balance=None)
+        .execution_options(synchronize_session=False)
+    )
+    for (account, period), (income, expense, net) in deltas.items():
+        increment = (update(AccountBalance)
+                     .where(AccountBalance.account == account, AccountBalance.period == period)
+                     .values(income=AccountBalance.income + income,
+                             expense=AccountBalance.expense + expense,
+                             net=AccountBalance.net + net)
+                     .execution_options(synchronize_session=False))
+        if db.session.execute(increment).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.add(AccountBalance(account=account, period=period,
+                                              income=income, expense=expense, net=net))
+        except IntegrityError:
+            db.session.execute(increment)  # dibuat bersamaan oleh request lain
+
+
+def close_period(period):
+    """Tutup satu bulan: hitung ulang total dari ledger lalu simpan saldo akhir
+    tiap akun (saldo penutupan sebelumnya + net bulan ini). Bulan yang sudah
+    ditutup sebelum period harus lengkap; tidak commit."""
+    start, end = _period_bounds(period)
+    totals = {
+        account or "": (income or 0.0, expense or 0.0, net or 0.0)
+        for account, income, expense, net in (
+            db.session.query(
+                Transaction.account,
+                func.sum(case((Transaction.category == "income", Transaction.amount), else_=0.0)),
+                func.sum(case((Transaction.category == "expense", Transaction.amount), else_=0.0)),
+                func.sum(case((Transaction.category == "income", Transaction.amount),
+                              else_=-Transaction.amount)))
+            .filter(Transaction.date >= start, Transaction.date < end)
+            .group_by(Transaction.account)
+        )
+    }
+    previous = _latest_closed(before=period)
+    opening = dict(
+        db.session.query(AccountBalance.account, AccountBalance.closing_balance)
+        .filter(AccountBalance.period == previous)
+    ) if previous else {}
+
+    rows = {row.account: row for row in AccountBalance.query.filter_by(period=period)}
     now = datetime.utcnow()
-    month_start = datetime(now.year, now.month, 1)
+    for account in set(totals) | set(opening) | set(rows):
+        income, expense, net = totals.get(account, (0.0, 0.0, 0.0))
+        row = rows.get(account)
+        if row is None:
+            row = AccountBalance(account=account, period=period)
+            db.session.add(row)
+        row.income, row.expense, row.net = income, expense, net
+        row.closing_balance = opening.get(account, 0.0) + net
+        row.closed_at = now
 
-    income = (db.session.query(func.sum(Transaction.amount))
-              .filter(Transaction.category == "income",
-                      Transaction.date >= month_start)
-              .scalar() or 0.0)
-    expense = (db.session.query(func.sum(Transaction.amount))
-               .filter(Transaction.category == "expense",
-                       Transaction.date >= month_start)
-               .scalar() or 0.0)
-    balance = (db.session.query(func.sum(
-                    case((Transaction.category == "income", Transaction.amount),
-                         else_=-Transaction.amount)))
-               .scalar() or 0.0)
 
-    return {"income": income, "expense": expense, "balance": balance}
+def _latest_closed(before=None):
+    query = db.session.query(func.max(AccountBalance.period)).filter(
+        AccountBalance.closed_at.isnot(None))
+    if before:
+        query = query.filter(AccountBalance.period < before)
+    return query.scalar()
 
 
-def get_mutations(mode):
-    """Ambil daftar mutasi keuangan berdasarkan mode waktu."""
-    today = datetime.utcnow().date()
-    query = Transaction.query
+def _close_open_periods(until=None):
+    """Tutup semua bulan terbuka sebelum `until` (default bulan berjalan),
+    urut dari yang terlama; tidak commit. Return daftar bulan yang ditutup."""
+    until = until or _period_of(local_today())
+    periods = [
+        period for (period,) in (
+            db.session.query(AccountBalance.period)
+            .filter(AccountBalance.closed_at.is_(None), AccountBalance.period < until)
+            .distinct().order_by(AccountBalance.period)
+        )
+    ]
+    for period in periods:
+        close_period(period)
+        db.session.flush()
+    return periods
+
+
+def close_periods(until=None):
+    """Seperti _close_open_periods, lalu commit (CLI / job terjadwal)."""
+    periods = _close_open_periods(until)
+    db.session.commit()
+    return periods
+
 
+def reclose_periods(since):
+    """Bangun ulang snapshot mulai bulan `since` dari ledger lalu tutup kembali
+    hingga bulan lalu. Dipakai setelah koreksi data langsung di tabel."""
+    db.session.execute(delete(AccountBalance).where(AccountBalance.period >= since))
+    start = _period_bounds(since)[0]
+    period_col = func.strftime("%Y-%m", Transaction.date)
+    for account, period, income, expense, net in (
+        db.session.query(
+            func.coalesce(Transaction.account, ""),
+            period_col,
+            func.sum(case((Transaction.category == "income", Transaction.amount), else_=0.0)),
+            func.sum(case((Transaction.category == "expense", Transaction.amount), else_=0.0)),
+            func.sum(case((Transaction.category == "income", Transaction.amount),
+                          else_=-Transaction.amount)))
+        .filter(Transaction.date >= start)
+        .group_by(func.coalesce(Transaction.account, ""), period_col)
+    ):
+        db.session.add(AccountBalance(account=account, period=period, income=income or 0.0,
+                                      expense=expense or 0.0, net=net or 0.0))
+    db.session.flush()
+    return close_periods()
+
+
+def get_summary():
+    """Hitung saldo, pendapatan, pengeluaran bulan berjalan.
+
+    Saldo = saldo penutupan bulan terakhir yang ditutup + net baris terbuka
+    sesudahnya; ledger tidak dipindai. Hanya membaca: penutupan bulan
+    dilakukan jalur tulis (add_transaction / import) dan CLI close-periods.
+    """
+    current = _period_of(local_today())
+    latest = _latest_closed()
+    closed = (db.session.query(func.sum(AccountBalance.closing_balance))
+              .filter(AccountBalance.period == latest)
+              .scalar() or 0.0) if latest else 0.0
+    income, expense, tail = (
+        db.session.query(
+            func.sum(case((AccountBalance.period == current, AccountBalance.income), else_=0.0)),
+            func.sum(case((AccountBalance.period == current, AccountBalance.expense), else_=0.0)),
+            func.sum(AccountBalance.net))
+        .filter(AccountBalance.closed_at.is_(None), AccountBalance.period > (latest or ""))
+        .one()
+    )
+
+    return {"income": income or 0.0, "expense": expense or 0.0, "balance": closed + (tail or 0.0)}
+
+
+def _mode_range(mode, today):
+    """Rentang [awal, akhir) untuk mode waktu; (None, None) untuk 'all'."""
     if mode == "daily":
-        query = query.filter(func.date(Transaction.date) == today)
-    elif mode == "monthly":
-        query = query.filter(func.extract("month", Transaction.date) == today.month,
-                             func.extract("year", Transaction.date) == today.year)
-    elif mode == "yearly":
-        query = query.filter(func.extract("year", Transaction.date) == today.year)
+        return today, today + timedelta(days=1)
+    if mode == "monthly":
+        return _period_bounds(_period_of(today))
+    if mode == "yearly":
+        return date(today.year, 1, 1), date(today.year + 1, 1, 1)
+    return None, None
+
+
+def mutations_query(mode, date_from=None, date_to=None, category=None):
+    """Query mutasi keuangan berdasarkan mode waktu (belum diurutkan).
+
+    Semua filter berupa rentang pada kolom date (tanpa fungsi di kolom),
+    sehingga dilayani index transactions(date) / (category, date).
+    date_from & date_to inklusif dan mempersempit rentang mode.
+    """
+    start, end = _mode_range(mode, local_today())
+    if date_from and (start is None or date_from > start):
+        start = date_from
+    if date_to and (end is None or date_to + timedelta(days=1) < end):
+        end = date_to + timedelta(days=1)
+
+    query = Transaction.query
+    if category:
+        query = query.filter(Transaction.category == category)
+    if start is not None:
+        query = query.filter(Transaction.date >= start)
+    if end is not None:
+        query = query.filter(Transaction.date < end)
+    return query
+
+
+def get_mutations(mode, date_from=None, date_to=None, category=None):
+    """Ambil daftar mutasi keuangan berdasarkan mode waktu."""
+    return (mutations_query(mode, date_from, date_to, category)
+            .order_by(Transaction.date.desc(), Transaction.id.desc())
+            .all())
+
+
+LEDGER_COLUMNS = ("ID", "Tanggal", "Kategori", "Deskripsi", "Sumber", "Akun", "Jumlah")
+
+
+def iter_ledger(mode, date_from=None, date_to=None, category=None, batch_size=2000):
+    """Iterasi baris ledger (tuple sesuai LEDGER_COLUMNS) urut kronologis.
+
+    Kolom dipilih langsung (bukan objek ORM) dan diambil per batch_size dari
+    cursor, jadi memori tidak tumbuh mengikuti jumlah baris.
+    """
+    query = (mutations_query(mode, date_from, date_to, category)
+             .with_entities(Transaction.id, Transaction.date, Transaction.category,
+                            Transaction.description, Transaction.source,
+                            Transaction.account, Transaction.amount)
+             .order_by(Transaction.date.asc(), Transaction.id.asc())
+             .execution_options(yield_per=batch_size))
+    for row in query:
+        yield tuple(row)
 
-    return query.order_by(Transaction.date.desc()).all()
+
+def recent_transactions(limit=20):
+    """Transaksi terbaru untuk dashboard (index transactions(date))."""
+    return (Transaction.query
+            .order_by(Transaction.date.desc(), Transaction.id.desc())
+            .limit(limit)
+            .all())
+
+
+def explain_mutations():
+    """Rencana query SQLite tiap mode mutasi: {nama: [baris detail]}.
+
+    Dipakai CLI `accounting explain-mutations` untuk memastikan setiap
+    mode dilayani index, bukan full scan.
+    """
+    today = local_today()
+    cases = {
+        "all": mutations_query("all"),
+        "daily": mutations_query("daily"),
+        "monthly": mutations_query("monthly"),
+        "yearly": mutations_query("yearly"),
+        "range": mutations_query("all", today - timedelta(days=30), today),
+        "category": mutations_query("monthly", category="income"),
+    }
+    plans = {}
+    for name, query in cases.items():
+        stmt = query.order_by(Transaction.date.desc(), Transaction.id.desc()).statement
+        compiled = stmt.compile(db.engine, compile_kwargs={"literal_binds": True})
+        rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        plans[name] = [row[-1] for row in rows]
+    return plans
+
+
+# kolom tabel mutasi, urut sesuai kolom DataTables di template
+MUTATION_COLUMNS = ("date", "category", "description", "source", "account", "amount")
+MUTATION_MAX_PAGE = 100
+
+
+def mutations_page(mode, start=0, length=10, search=None, order_column=0, order_dir="desc",
+                   date_from=None, date_to=None, category=None):
+    """Satu jendela mutasi untuk DataTables server-side.
+
+    Return (total, filtered, rows): total baris mode ini, total setelah
+    pencarian global, dan baris halaman yang diminta saja.
+    """
+    query = mutations_query(mode, date_from, date_to, category)
+    total = query.order_by(None).count()
+
+    search = (search or "").strip()
+    if search:
+        like = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = query.filter(db.or_(*(
+            getattr(Transaction, col).ilike(like, escape="\\")
+            for col in ("category", "description", "source", "account")
+        )))
+        filtered = query.order_by(None).count()
+    else:
+        filtered = total
+
+    if not 0 <= order_column < len(MUTATION_COLUMNS):
+        order_column = 0
+    column = getattr(Transaction, MUTATION_COLUMNS[order_column])
+    tiebreak = Transaction.id
+    if order_dir == "asc":
+        query = query.order_by(column.asc(), tiebreak.asc())
+    else:
+        query = query.order_by(column.desc(), tiebreak.desc())
+
+    length = min(max(length, 1), MUTATION_MAX_PAGE)
+    rows = query.offset(max(start, 0)).limit(length).all()
+    return total, filtered, rows
 
 
 def add_transaction(data, filename=None):
     """Tambah transaksi baru ke database."""
     txn = Transaction(
-        date=datetime.utcnow().date(),
+        date=local_today(),
         category=data.get("category"),
         description=data.get("description"),
         source=data.get("source"),
@@ -53,5 +330,218 @@ def add_transaction(data, filename=None):
         receipt=filename,
     )
     db.session.add(txn)
+    _apply_to_snapshot(txn)
+    _close_open_periods()  # transaksi pertama di bulan baru menutup bulan lalu
+    db.session.commit()
+    return txn
+
+
+# === Import mutasi rekening (CSV bank) ===
+STATEMENT_CHUNK_SIZE = 1000
+STATEMENT_MAX_ERRORS = 1000
+STATEMENT_SOURCE = "Mutasi Bank"
+STATEMENT_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y", "%d %b %Y")
+
+# nama kolom yang dikenali dari berbagai format ekspor bank
+_STATEMENT_COLUMNS = {
+    "date": ("tanggal", "tgl", "date", "tanggal transaksi", "tgl transaksi",
+             "transaction date", "posting date"),
+    "description": ("keterangan", "deskripsi", "description", "uraian", "remarks", "berita"),
+    "amount": ("jumlah", "amount", "nominal", "mutasi"),
+    "debit": ("debit", "debet", "keluar"),
+    "credit": ("kredit", "credit", "masuk"),
+    "type": ("jenis", "type", "tipe", "d/k", "db/cr", "cr/db"),
+    "account": ("akun", "account", "rekening", "no rekening"),
+}
+
+
+def _header_key(cell):
+    return re.sub(r"[^a-z/ ]", "", cell.strip().lower()).strip()
+
+
+def _statement_header(row):
+    """Peta kolom -> indeks bila baris ini header mutasi, selain itu None."""
+    keys = [_header_key(cell) for cell in row]
+    found = {}
+    for field, aliases in _STATEMENT_COLUMNS.items():
+        for i, key in enumerate(keys):
+            if key in aliases:
+                found.setdefault(field, i)
+    if "date" in found and ("amount" in found or "debit" in found or "credit" in found):
+        return found
+    return None
+
+
+_DK_MARKER = re.compile(r"(KREDIT|CREDIT|DEBIT|DEBET|CR|DB|D|K)$")
+_DEBIT_MARKERS = {"DEBIT", "DEBET", "DB", "D"}
+
+
+def _dk_marker(value):
+    """Pisahkan penanda debit/kredit ala BCA di akhir teks (spasi diabaikan,
+    jadi '1.500,00DB' sama dengan '1.500,00 DB'). Return (teks tanpa penanda,
+    True bila debit / False bila kredit / None bila tidak ada penanda)."""
+    text = (value or "").strip().upper().replace(" ", "")
+    match = _DK_MARKER.search(text)
+    if not match:
+        return text, None
+    return text[:match.start()], match.group(1) in _DEBIT_MARKERS
+
+
+def parse_amount(value):
+    """'1.500.000,00' / '1,500,000.00 CR' / '250DB' / '(250.00)' / '-75' -> float
+    bertanda; penanda debit membuat hasilnya negatif."""
+    text, debit = _dk_marker((value or "").upper().replace("RP", ""))
+    negative = text.startswith("-") or (text.startswith("(") and text.endswith(")"))
+    text = text.strip("-()+")
+    if not text:
+        return None
+    if "," in text and "." in text:
+        decimal = "," if text.rfind(",") > text.rfind(".") else "."
+    elif "," in text:
+        decimal = "," if re.search(r",\d{1,2}$", text) else None
+    elif text.count(".") == 1 and not re.search(r"\.\d{3}$", text):
+        decimal = "."
+    else:
+        decimal = None
+    thousands = {",": ".", ".": ",", None: ".,"}[decimal]
+    text = text.translate({ord(c): None for c in thousands})
+    if decimal == ",":
+        text = text.replace(",", ".")
+    amount = float(text)
+    return -abs(amount) if negative or debit else amount
+
+
+def _parse_statement_date(value):
+    value = (value or "").strip()
+    for fmt in STATEMENT_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Tanggal '{value}' tidak dikenali.")
+
+
+def parse_statement_row(row, columns, account):
+    """Normalisasi satu baris mutasi bank menjadi kolom Transaction.
+    Kredit -> income, debit -> expense. Raise ValueError bila tidak valid."""
+    def cell(field):
+        i = columns.get(field)
+        return row[i].strip() if i is not None and i < len(row) else ""
+
+    day = _parse_statement_date(cell("date"))
+    try:
+        if "amount" in columns:
+            amount = parse_amount(cell("amount"))  # penanda di kolom jumlah sudah dihitung
+            debit = _dk_marker(cell("type"))[1]
+            if amount is not None and debit is not None:
+                amount = -abs(amount) if debit else abs(amount)
+        else:
+            credit, debit = parse_amount(cell("credit")), parse_amount(cell("debit"))
+            amount = (credit or 0.0) - abs(debit or 0.0) if credit or debit else None
+    except ValueError:
+        raise ValueError("Jumlah bukan angka.")
+    if not amount:
+        raise ValueError("Jumlah kosong atau nol.")
+
+    return {
+        "date": day,
+        "category": "income" if amount > 0 else "expense",
+        "description": cell("description")[:255] or None,
+        "source": STATEMENT_SOURCE,
+        "account": (cell("account") or account)[:100],
+        "amount": abs(amount),
+    }
+
+
+def _statement_hash(values, occurrence):
+    """Kunci alami baris mutasi; occurrence membedakan baris kembar di satu file."""
+    raw = "|".join((values["account"], values["date"].isoformat(), values["category"],
+                    f"{values['amount']:.2f}", values["description"] or "", str(occurrence)))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def import_statement_csv(lines, account, chunk_size=STATEMENT_CHUNK_SIZE):
+    """Import mutasi rekening dari CSV bank, dibaca baris demi baris.
+
+    Baris sebelum header (info rekening dsb.) dilewati. Duplikat dikenali
+    lewat unique index transactions.import_hash: INSERT ... ON CONFLICT DO
+    NOTHING per chunk, tanpa query per baris; file yang sama aman diimport
+    ulang. Snapshot saldo ikut diperbarui per chunk.
+    Return {"inserted", "duplicates", "failed", "errors": [(baris, pesan)]}.
+    """
+    reader = csv.reader(lines)
+    report = {"inserted": 0, "duplicates": 0, "failed": 0, "errors": []}
+    table = Transaction.__table__
+    occurrences = Counter()
+    chunk = []
+
+    def flush():
+        stmt = (sqlite_insert(table)
+                .on_conflict_do_nothing(index_elements=["import_hash"])
+                .returning(table.c.import_hash))
+        inserted = set(db.session.execute(stmt, chunk).scalars())
+        deltas = {}
+        for values in chunk:
+            if values["import_hash"] not in inserted:
+                continue
+            key = (values["account"], _period_of(values["date"]))
+            current = deltas.get(key, (0.0, 0.0, 0.0))
+            deltas[key] = tuple(a + b for a, b in zip(
+                current, _deltas(values["category"], values["amount"])))
+        _apply_deltas(deltas)
+        db.session.commit()
+        report["inserted"] += len(inserted)
+        report["duplicates"] += len(chunk) - len(inserted)
+        chunk.clear()
+
+    columns = None
+    for row in reader:
+        if columns is None:
+            columns = _statement_header(row)
+            continue
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            values = parse_statement_row(row, columns, account)
+        except ValueError as e:
+            report["failed"] += 1
+            if len(report["errors"]) < STATEMENT_MAX_ERRORS:
+                report["errors"].append((reader.line_num, str(e)))
+            continue
+        natural_key = _statement_hash(values, 0)
+        values["import_hash"] = _statement_hash(values, occurrences[natural_key])
+        occurrences[natural_key] += 1
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    if report["inserted"]:
+        close_periods()  # sekali di akhir, bukan per chunk
+
+    if columns is None:
+        report["errors"].append((0, "Header kolom tanggal/jumlah tidak ditemukan."))
+    return report
+
+
+def run_statement_import(import_id, path):
+    """Job latar: import file yang sudah disimpan lalu catat laporannya."""
+    job = db.session.get(StatementImport, import_id)
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            report = import_statement_csv(f, job.account)
+    except Exception as e:
+        db.session.rollback()
+        job.status, job.errors = "failed", json.dumps([[0, str(e)]])
+    else:
+        job.status = "done"
+        job.inserted, job.duplicates, job.failed = (
+            report["inserted"], report["duplicates"], report["failed"])
+        job.errors = json.dumps(report["errors"])
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    job.finished_at = datetime.utcnow()
     db.session.commit()
-    return txn
\ No newline at end of file
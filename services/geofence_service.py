@@ -0,0 +1,128 @@
+# services/geofence_service.py
+"""Geofence multi-site untuk absensi.
+
+Site aktif dimuat dari tabel office_sites ke index grid (bucket per sel
+GRID_DEG derajat). Tiap site didaftarkan ke semua sel yang tersentuh
+radiusnya, sehingga satu titik cukup dibandingkan dengan site di selnya.
+"""
+from collections import defaultdict
+from math import radians, sin, cos, sqrt, atan2, floor, inf
+from time import monotonic
+from sqlalchemy import event
+from models import db, Attendance, OfficeSite
+
+GRID_DEG = 0.01        # ukuran sel grid (~1,1 km di ekuator)
+INDEX_TTL = 60         # detik; index dimuat ulang agar perubahan proses lain terbaca
+EARTH_R = 6371000
+M_PER_DEG = 111320
+
+_index = None
+_built_at = 0.0
+
+
+class _Site:
+    """Salinan ringan site + nilai trigonometri yang sudah dihitung."""
+    __slots__ = ("id", "name", "lat", "lon", "radius", "lat_r", "lon_r", "cos_lat")
+
+    def __init__(self, id, name, lat, lon, radius):
+        self.id, self.name = id, name
+        self.lat, self.lon, self.radius = lat, lon, radius
+        self.lat_r, self.lon_r = radians(lat), radians(lon)
+        self.cos_lat = cos(self.lat_r)
+
+    def distance_m(self, lat_r, lon_r, cos_lat):
+        """Haversine dari titik (dalam radian, cos lat sudah dihitung)."""
+        a = (sin((self.lat_r - lat_r) / 2) ** 2
+             + cos_lat * self.cos_lat * sin((self.lon_r - lon_r) / 2) ** 2)
+        return EARTH_R * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+def _cell(lat, lon):
+    return floor(lat / GRID_DEG), floor(lon / GRID_DEG)
+
+
+def build_index(sites):
+    """Bangun dict sel -> [site] dari iterable (id, name, lat, lon, radius)."""
+    grid = defaultdict(list)
+    for row in sites:
+        site = _Site(*row)
+        dlat = site.radius / M_PER_DEG
+        dlon = site.radius / (M_PER_DEG * max(site.cos_lat, 1e-6))
+        lat0, lon0 = _cell(site.lat - dlat, site.lon - dlon)
+        lat1, lon1 = _cell(site.lat + dlat, site.lon + dlon)
+        for i in range(lat0, lat1 + 1):
+            for j in range(lon0, lon1 + 1):
+                grid[(i, j)].append(site)
+    return dict(grid)
+
+
+def get_index():
+    """Index grid site aktif (di-cache per proses)."""
+    global _index, _built_at
+    if _index is None or monotonic() - _built_at > INDEX_TTL:
+        rows = (db.session.query(OfficeSite.id, OfficeSite.name, OfficeSite.latitude,
+                                 OfficeSite.longitude, OfficeSite.radius_m)
+                .filter(OfficeSite.active.is_(True))
+                .all())
+        _index, _built_at = build_index(rows), monotonic()
+    return _index
+
+
+def invalidate_index(*_):
+    global _index
+    _index = None
+
+
+for _evt in ("after_insert", "after_update", "after_delete"):
+    event.listen(OfficeSite, _evt, invalidate_index)
+
+
+def get_sites():
+    """Daftar site aktif untuk dikirim ke browser (cek radius di sisi klien)."""
+    return [
+        {"name": s.name, "lat": s.latitude, "lng": s.longitude, "radius": s.radius_m}
+        for s in OfficeSite.query.filter_by(active=True).order_by(OfficeSite.name).all()
+    ]
+
+
+def match_site(lat, lon, index=None):
+    """Cari site yang memuat titik. Return (site|None, jarak ke kandidat terdekat).
+
+    Hanya site di sel grid titik ini yang dievaluasi; bila tidak ada kandidat
+    jarak bernilai inf.
+    """
+    index = get_index() if index is None else index
+    lat_r, lon_r = radians(lat), radians(lon)
+    cos_lat = cos(lat_r)
+    best, best_dist = None, inf
+    for site in index.get(_cell(lat, lon), ()):
+        dist = site.distance_m(lat_r, lon_r, cos_lat)
+        if dist <= site.radius and (best is None or dist < best_dist):
+            best, best_dist = site, dist
+        elif best is None and dist < best_dist:
+            best_dist = dist
+    return best, best_dist
+
+
+def revalidate_day(day_start, day_end):
+    """Validasi ulang seluruh absensi pada rentang [day_start, day_end) sekaligus.
+
+    Index dibangun sekali, baris dibaca sebagai tuple ringan (tanpa ORM
+    object). Return list anomali: absensi tanpa koordinat atau di luar site.
+    """
+    index = get_index()
+    rows = (db.session.query(Attendance.id, Attendance.username, Attendance.status,
+                             Attendance.timestamp, Attendance.latitude, Attendance.longitude)
+            .filter(Attendance.timestamp >= day_start, Attendance.timestamp < day_end)
+            .order_by(Attendance.timestamp)
+            .execution_options(yield_per=1000))
+    anomalies = []
+    for row in rows:
+        if row.latitude is None or row.longitude is None:
+            anomalies.append({**row._asdict(), "site": None, "distance_m": None})
+            continue
+        site, dist = match_site(row.latitude, row.longitude, index)
+        if site is None:
+            anomalies.append({**row._asdict(), "site": None,
+                              "distance_m": None if dist == inf else round(dist, 1)})
+    return anomalies
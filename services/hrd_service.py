@@ -0,0 +1,497 @@
+# services/hrd_service.py
+import calendar
+import csv
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta
+from itertools import groupby
+from operator import itemgetter
+from time import monotonic
+from sqlalchemy import event, text, delete, update, func
+from sqlalchemy.orm import Session, object_session
+from models import (
+    db, Employee, Attendance, AttendanceDaily, Performance, User, PayrollRun, Payslip
+)
+from holycity.data_version import get_version
+
+EMPLOYEE_PAGE_SIZE = 25
+TYPEAHEAD_LIMIT = 10
+IMPORT_CHUNK_SIZE = 500
+IMPORT_MAX_ERRORS = 1000  # detail error yang disimpan di laporan import
+
+# --- aturan payroll ---
+PAYROLL_UTC_OFFSET = timedelta(hours=7)  # WIB; timestamp absensi disimpan dalam UTC
+WORK_START = time(8, 0)                  # jam masuk (waktu lokal)
+WORK_MINUTES_PER_DAY = 8 * 60
+OVERTIME_MULTIPLIER = 1.5
+PAYSLIP_CHUNK_SIZE = 500
+
+
+LOCAL_DATE_MODIFIER = f"{PAYROLL_UTC_OFFSET.total_seconds() / 3600:+g} hours"  # untuk date() SQLite
+
+
+def local_day(ts):
+    """Tanggal WIB dari timestamp UTC (aturan hari yang sama dengan payroll)."""
+    return (ts + PAYROLL_UTC_OFFSET).date()
+
+
+def local_today():
+    return local_day(datetime.utcnow())
+
+# --- cache angka dashboard HRD (per proses, per hari) ---
+DASHBOARD_CACHE_TTL = 30  # detik; batas basi untuk perubahan dari worker lain
+_dashboard_cache = {}     # day -> (expires_at, counts)
+
+
+def get_dashboard_counts(day=None):
+    """Total karyawan, hadir & izin pada satu hari (default hari ini).
+
+    Hasil disimpan di memori sampai ada insert/delete Employee/Attendance
+    pada proses ini, atau TTL habis.
+    """
+    day = day or local_today()
+    hit = _dashboard_cache.get(day)
+    if hit and hit[0] > monotonic():
+        return hit[1]
+
+    counts = {
+        "total_karyawan": Employee.query.filter(Employee.archived_at.is_(None)).count(),
+        "total_hadir": AttendanceDaily.query.filter_by(day=day, status="Hadir").count(),
+        "total_izin": AttendanceDaily.query.filter_by(day=day, status="Izin").count(),
+    }
+    _dashboard_cache[day] = (monotonic() + DASHBOARD_CACHE_TTL, counts)
+    return counts
+
+
+def invalidate_dashboard_counts():
+    _dashboard_cache.clear()
+
+
+def _mark_dirty(mapper, connection, target):
+    # hapus sekarang, dan sekali lagi setelah commit agar request yang
+    # menghitung ulang di antara flush & commit tidak menyimpan angka lama
+    invalidate_dashboard_counts()
+    session = object_session(target)
+    if session is not None:
+        session.info["hrd_dashboard_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop("hrd_dashboard_dirty", False):
+        invalidate_dashboard_counts()
+
+
+for _model in (Employee, Attendance, AttendanceDaily):
+    event.listen(_model, "after_insert", _mark_dirty)
+    event.listen(_model, "after_delete", _mark_dirty)
+event.listen(AttendanceDaily, "after_update", _mark_dirty)
+
+
+# --- direktori karyawan (FTS5) ---
+_fts_available = None
+
+
+def employee_fts_available():
+    """True bila tabel employees_fts (migrasi FTS5) ada. Dicek sekali per proses."""
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'employees_fts'"
+        )).first() is not None if db.engine.dialect.name == "sqlite" else False
+    return _fts_available
+
+
+def _fts_prefix_query(q):
+    """'budi keu' -> '"budi"* "keu"*' (setiap kata dicocokkan sebagai prefix)."""
+    return " ".join(f'"{token}"*' for token in re.findall(r"\w+", q))
+
+
+def search_employees_query(q=None, include_archived=False):
+    """Query Employee terurut nama, difilter prefix nama/departemen/posisi."""
+    query = Employee.query
+    if not include_archived:
+        query = query.filter(Employee.archived_at.is_(None))
+    match = _fts_prefix_query(q or "")
+    if match:
+        if employee_fts_available():
+            ids = (text("SELECT rowid FROM employees_fts WHERE employees_fts MATCH :match")
+                   .bindparams(match=match)
+                   .columns(db.column("rowid")))
+            query = query.filter(Employee.id.in_(ids))
+        else:
+            like = f"{q.strip()}%"
+            query = query.filter(db.or_(Employee.name.ilike(like),
+                                        Employee.department.ilike(like),
+                                        Employee.position.ilike(like)))
+    return query.order_by(Employee.name.asc(), Employee.id.asc())
+
+
+def list_employees(q=None, page=1, per_page=EMPLOYEE_PAGE_SIZE, include_archived=False):
+    """Satu halaman direktori karyawan (objek Pagination Flask-SQLAlchemy)."""
+    return search_employees_query(q, include_archived).paginate(
+        page=page, per_page=per_page, max_per_page=100, error_out=False
+    )
+
+
+def typeahead_employees(q, limit=TYPEAHEAD_LIMIT):
+    """Kandidat ringkas untuk pemilih karyawan (id, nama, departemen, posisi)."""
+    rows = (search_employees_query(q)
+            .with_entities(Employee.id, Employee.name, Employee.department, Employee.position)
+            .limit(limit)
+            .all())
+    return [row._asdict() for row in rows]
+
+
+# --- data karyawan: parsing & import massal ---
+def parse_employee_fields(data):
+    """Validasi & konversi input karyawan (form atau baris CSV).
+
+    Aturan sama untuk form tambah dan import: nama wajib, join_date format
+    YYYY-MM-DD (kosong = hari ini), salary angka (kosong = 0).
+    Return dict kolom Employee; raise ValueError dengan pesan untuk user.
+    """
+    name = (data.get("name") or "").strip()
+    if not name:
+        raise ValueError("Nama karyawan harus diisi.")
+
+    values = {
+        "name": name,
+        "department": (data.get("department") or "").strip() or None,
+        "position": (data.get("position") or "").strip() or None,
+        "salary": 0.0,
+    }
+    join_date = (data.get("join_date") or "").strip()
+    if join_date:
+        try:
+            values["join_date"] = datetime.strptime(join_date, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError(f"Tanggal bergabung '{join_date}' harus berformat YYYY-MM-DD.")
+    salary = (data.get("salary") or "").strip()
+    if salary:
+        try:
+            values["salary"] = float(salary)
+        except ValueError:
+            raise ValueError(f"Gaji '{salary}' bukan angka.")
+    return values
+
+
+def import_employees_csv(lines, chunk_size=IMPORT_CHUNK_SIZE):
+    """Import karyawan dari CSV (header: name, department, position,
+    join_date, salary) yang dibaca baris demi baris.
+
+    Baris valid ditulis per chunk, satu transaksi per chunk; memori tetap
+    konstan berapapun ukuran file. File yang tidak bisa dibaca lagi (bukan
+    UTF-8, mis. CSV simpanan Excel/CP1252, atau berisi byte NUL) berhenti
+    di situ: baris sebelumnya tetap diimport, sisanya dilaporkan sebagai
+    satu error. Hanya CSV; XLSX perlu disimpan ulang sebagai "CSV UTF-8".
+    Return laporan:
+    {"inserted": n, "failed": n, "errors": [(nomor_baris, pesan), ...]}.
+    """
+    reader = csv.DictReader(lines)
+    report = {"inserted": 0, "failed": 0, "errors": []}
+    table = Employee.__table__
+    chunk = []
+
+    def flush():
+        db.session.execute(table.insert(), chunk)
+        db.session.commit()
+        report["inserted"] += len(chunk)
+        chunk.clear()
+
+    try:
+        if reader.fieldnames:
+            reader.fieldnames = [f.strip().lower() for f in reader.fieldnames]
+        for row in reader:
+            try:
+                values = parse_employee_fields(row)
+            except ValueError as e:
+                report["failed"] += 1
+                if len(report["errors"]) < IMPORT_MAX_ERRORS:
+                    report["errors"].append((reader.line_num, str(e)))
+                continue
+            values.setdefault("join_date", date.today())
+            chunk.append(values)
+            if len(chunk) >= chunk_size:
+                flush()
+    except UnicodeDecodeError:
+        # stream didekode per blok, jadi posisi pastinya bisa beberapa baris sesudahnya
+        report["errors"].append((reader.line_num + 1, "File bukan UTF-8 (mis. CSV dari Excel) mulai "
+                                 "sekitar baris ini; simpan ulang sebagai \"CSV UTF-8\". "
+                                 "Sisa file tidak diimport."))
+    except csv.Error as e:
+        report["errors"].append((reader.line_num, f"Format CSV rusak ({e}). Sisa file tidak diimport."))
+    if chunk:
+        flush()
+
+    invalidate_dashboard_counts()  # insert massal tidak memicu event ORM
+    return report
+
+
+# --- hapus / arsip karyawan ---
+def delete_employee(emp_id):
+    """Hapus karyawan beserta riwayat absensi & penilaiannya.
+
+    Setiap tabel anak dibersihkan dengan satu DELETE ... WHERE employee_id
+    (berindex) dalam satu transaksi, sehingga jumlah statement tetap
+    berapapun panjang riwayatnya; tidak ada baris yang dimuat ke session.
+    Karyawan yang sudah punya slip gaji tidak boleh dihapus (payroll yang
+    sudah ditutup harus tetap utuh) — raise ValueError, arsipkan saja.
+    Return jumlah baris terhapus per tabel.
+    """
+    has_payslip = db.session.execute(
+        db.select(Payslip.id).where(Payslip.employee_id == emp_id).limit(1)
+    ).first()
+    if has_payslip:
+        raise ValueError("Karyawan sudah memiliki slip gaji; arsipkan saja agar riwayat payroll tetap utuh.")
+
+    counts = {}
+    for model in (Attendance, AttendanceDaily, Performance):
+        result = db.session.execute(
+            delete(model).where(model.employee_id == emp_id),
+            execution_options={"synchronize_session": False},
+        )
+        counts[model.__tablename__] = result.rowcount
+    db.session.execute(
+        update(User).where(User.employee_id == emp_id).values(employee_id=None),
+        execution_options={"synchronize_session": False},
+    )
+    result = db.session.execute(
+        delete(Employee).where(Employee.id == emp_id),
+        execution_options={"synchronize_session": False},
+    )
+    counts[Employee.__tablename__] = result.rowcount
+    db.session.commit()
+    db.session.expire_all()
+    invalidate_dashboard_counts()  # delete set-based tidak memicu event ORM
+    return counts
+
+
+def archive_employee(emp, archived=True):
+    """Soft-delete: sembunyikan karyawan dari direktori tanpa menghapus riwayat."""
+    emp.archived_at = datetime.utcnow() if archived else None
+    db.session.commit()
+    invalidate_dashboard_counts()
+
+
+# --- payroll bulanan ---
+def working_days_in(year, month, since=None):
+    """Jumlah hari kerja (Senin–Jumat) dalam satu bulan; bila `since` jatuh di
+    bulan itu, dihitung mulai tanggal tersebut (karyawan baru bergabung)."""
+    first = since.day if since and (since.year, since.month) == (year, month) else 1
+    return sum(1 for week in calendar.monthcalendar(year, month) for d in week[:5] if d >= first)
+
+
+def _pair_events(events):
+    """Pasangkan Masuk -> Keluar dalam satu lintasan (events terurut waktu lokal).
+
+    Return (hari_kerja, menit_terlambat, menit_lembur).
+    """
+    worked_days, late, overtime = set(), 0, 0
+    check_in = None
+    for status, ts in events:
+        if status == "Masuk":
+            check_in = ts
+            if ts.date() not in worked_days:
+                worked_days.add(ts.date())
+                start = datetime.combine(ts.date(), WORK_START)
+                late += max(0, int((ts - start).total_seconds() // 60))
+        elif status == "Keluar" and check_in is not None:
+            minutes = int((ts - check_in).total_seconds() // 60)
+            overtime += max(0, minutes - WORK_MINUTES_PER_DAY)
+            check_in = None
+    return len(worked_days), late, overtime
+
+
+def _compute_payslips(args):
+    """Hitung payslip untuk satu potongan karyawan (fungsi murni, aman untuk
+    process pool). args = (working_days, [(employee_id, salary, hari_kerja_karyawan,
+    events), ...]); hari kerja karyawan < working_days bila bergabung di tengah bulan:
+    gaji pokok diprorata dan hanya hari sejak bergabung yang bisa dihitung absen."""
+    working_days, employees = args
+    slips = []
+    for employee_id, salary, eligible_days, events in employees:
+        salary = salary or 0.0
+        worked, late, overtime = _pair_events(events)
+        daily_rate = salary / working_days if working_days else 0.0
+        minute_rate = daily_rate / WORK_MINUTES_PER_DAY
+        base = salary if eligible_days >= working_days else round(daily_rate * eligible_days, 2)
+        absence = daily_rate * max(0, eligible_days - worked)
+        late_cut = minute_rate * late
+        overtime_pay = minute_rate * OVERTIME_MULTIPLIER * overtime
+        slips.append({
+            "employee_id": employee_id,
+            "base_salary": base,
+            "worked_days": worked,
+            "late_minutes": late,
+            "overtime_minutes": overtime,
+            "absence_deduction": round(absence, 2),
+            "late_deduction": round(late_cut, 2),
+            "overtime_pay": round(overtime_pay, 2),
+            "net_pay": round(max(0.0, base - absence - late_cut + overtime_pay), 2),
+        })
+    return slips
+
+
+def compute_payroll(year, month, workers=None, chunk_size=250):
+    """Hitung payslip seluruh karyawan untuk satu bulan tanpa menyimpan.
+
+    Absensi dibaca sekali, terurut (employee_id, timestamp), lalu dikelompokkan
+    per karyawan. workers > 1 membagi potongan karyawan ke process pool.
+    Karyawan yang bergabung sesudah bulan ini tidak ikut dihitung.
+    """
+    local_start = datetime(year, month, 1)
+    local_end = datetime(year + month // 12, month % 12 + 1, 1)
+    start, end = local_start - PAYROLL_UTC_OFFSET, local_end - PAYROLL_UTC_OFFSET
+
+    employees = (db.session.query(Employee.id, Employee.salary, Employee.join_date)
+                 .filter(db.or_(Employee.archived_at.is_(None),
+                                Employee.archived_at >= start),
+                         db.or_(Employee.join_date.is_(None),
+                                Employee.join_date < local_end.date()))
+                 .order_by(Employee.id)
+                 .all())
+
+    # kunci integer, dilayani index (employee_id, timestamp)
+    rows = (db.session.query(Attendance.employee_id, Attendance.status, Attendance.timestamp)
+            .filter(Attendance.employee_id.isnot(None),
+                    Attendance.timestamp >= start, Attendance.timestamp < end,
+                    Attendance.status.in_(("Masuk", "Keluar")))
+            .order_by(Attendance.employee_id, Attendance.timestamp)
+            .execution_options(yield_per=5000))
+    events = {
+        employee_id: [(status, ts + PAYROLL_UTC_OFFSET) for _, status, ts in group]
+        for employee_id, group in groupby(rows, key=itemgetter(0))
+    }
+
+    working_days = working_days_in(year, month)
+    batch = [(emp_id, salary, working_days_in(year, month, since=join_date), events.get(emp_id, []))
+             for emp_id, salary, join_date in employees]
+    chunks = [(working_days, batch[i:i + chunk_size]) for i in range(0, len(batch), chunk_size)]
+    if workers and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_compute_payslips, chunks)
+            slips = [slip for chunk in results for slip in chunk]
+    else:
+        slips = [slip for chunk in chunks for slip in _compute_payslips(chunk)]
+    return working_days, slips
+
+
+def run_payroll(period, workers=None, force=False):
+    """Jalankan & simpan payroll periode 'YYYY-MM'.
+
+    Periode yang sudah ditutup langsung dikembalikan dari tabel payroll_runs
+    (lookup unik per periode); force=True menghitung ulang.
+    """
+    run = PayrollRun.query.filter_by(period=period).first()
+    if run is not None and not force:
+        return run
+
+    year, month = (int(part) for part in period.split("-"))
+    working_days, slips = compute_payroll(year, month, workers=workers)
+
+    if run is not None:
+        db.session.execute(delete(Payslip).where(Payslip.run_id == run.id))
+        db.session.delete(run)
+        db.session.flush()
+
+    run = PayrollRun(
+        period=period,
+        working_days=working_days,
+        employee_count=len(slips),
+        total_net=round(sum(slip["net_pay"] for slip in slips), 2),
+        closed_at=datetime.utcnow(),
+    )
+    db.session.add(run)
+    db.session.flush()
+    for i in range(0, len(slips), PAYSLIP_CHUNK_SIZE):
+        chunk = [{**slip, "run_id": run.id} for slip in slips[i:i + PAYSLIP_CHUNK_SIZE]]
+        db.session.execute(Payslip.__table__.insert(), chunk)
+    db.session.commit()
+    return run
+
+
+# --- analitik kinerja (window function) ---
+_analytics_cache = OrderedDict()  # (jenis, kunci, versi) -> hasil, urut LRU
+ANALYTICS_CACHE_MAX = 256
+
+
+def _ranked_performance():
+    """Subquery: nilai per karyawan per periode beserta rata-rata departemen,
+    peringkat, persentil dan selisih dari periode sebelumnya — semuanya
+    dihitung database dengan window function."""
+    base = (db.session.query(
+                Performance.employee_id.label("employee_id"),
+                Performance.period.label("period"),
+                func.avg(Performance.score).label("score"))
+            .group_by(Performance.employee_id, Performance.period)
+            .subquery())
+    by_period = {"partition_by": base.c.period}
+    return (db.session.query(
+                base.c.employee_id,
+                base.c.period,
+                Employee.name,
+                Employee.department,
+                base.c.score,
+                func.avg(base.c.score).over(
+                    partition_by=(base.c.period, Employee.department)).label("dept_avg"),
+                func.rank().over(order_by=base.c.score.desc(), **by_period).label("rank"),
+                func.percent_rank().over(order_by=base.c.score, **by_period).label("percentile"),
+                (base.c.score - func.lag(base.c.score).over(
+                    partition_by=base.c.employee_id, order_by=base.c.period)).label("delta"))
+            .join(Employee, Employee.id == base.c.employee_id)
+            .subquery())
+
+
+def _cached(kind, key, compute):
+    # selalu dikunci dengan versi data performance/employees: periode lama pun
+    # bisa berubah (nilai dikoreksi, karyawan pindah departemen/dihapus)
+    cache_key = (kind, key, get_version("performance", "employees"))
+    if cache_key in _analytics_cache:
+        _analytics_cache.move_to_end(cache_key)
+        return _analytics_cache[cache_key]
+    result = _analytics_cache[cache_key] = compute()
+    if len(_analytics_cache) > ANALYTICS_CACHE_MAX:
+        _analytics_cache.popitem(last=False)  # buang yang paling lama tidak dipakai
+    return result
+
+
+def _row_dict(row):
+    return {
+        "employee_id": row.employee_id,
+        "period": row.period,
+        "name": row.name,
+        "department": row.department,
+        "score": round(row.score, 2),
+        "dept_avg": round(row.dept_avg, 2),
+        "rank": row.rank,
+        "percentile": round(float(row.percentile) * 100, 1),
+        "delta": None if row.delta is None else round(row.delta, 2),
+    }
+
+
+def performance_analytics(period):
+    """Peringkat & perbandingan kinerja seluruh karyawan untuk satu periode."""
+    def compute():
+        ranked = _ranked_performance()
+        rows = (db.session.query(ranked)
+                .filter(ranked.c.period == period)
+                .order_by(ranked.c.rank, ranked.c.name)
+                .all())
+        return [_row_dict(row) for row in rows]
+
+    return _cached("period", period, compute)
+
+
+def performance_trend(employee_id):
+    """Deret waktu kinerja satu karyawan (nilai, rata-rata dept, peringkat)."""
+    def compute():
+        ranked = _ranked_performance()
+        rows = (db.session.query(ranked)
+                .filter(ranked.c.employee_id == employee_id)
+                .order_by(ranked.c.period)
+                .all())
+        return [_row_dict(row) for row in rows]
+
+    return _cached("trend", employee_id, compute)
@@ -0,0 +1,651 @@
+# services/marketing_service.py
+"""Query halaman marketing dan analitik funnel.
+
+Relasi yang dipakai template dimuat sekaligus (joinedload untuk many-to-one,
+selectinload untuk one-to-many) dan kolom dibatasi pada yang ditampilkan,
+sehingga jumlah statement SQL per halaman tetap, berapa pun jumlah barisnya.
+
+Funnel prospek -> lead -> proyek -> follow-up disimpan sebagai agregat kecil
+di marketing_funnel_stats: dihitung penuh sekali (satu query ber-GROUP BY per
+tahap), lalu ditambah delta setiap kali data baru masuk lewat endpoint add_*.
+Dashboard cukup membaca tabel agregat itu.
+
+Deteksi duplikat client/prospek memakai nama yang dinormalisasi
+(marketing_name_keys) dan index trigram FTS5 di atasnya.
+"""
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from datetime import datetime, time
+from sqlalchemy import case, delete, event, func, insert, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import aliased, joinedload, load_only, selectinload
+from models import (
+    db, MarketingProspect, MarketingLead, MarketingProject, MarketingFollowUp,
+    MarketingFunnelStat, MarketingClient, MarketingNameKey
+)
+
+LEADS_PAGE_SIZE = 25
+PROJECTS_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+RECENT_FOLLOWUPS = 10
+OFFER_LETTER_BATCH_MAX = 200  # dokumen per batch surat penawaran
+
+
+def _paginate(stmt, page, per_page):
+    return db.paginate(stmt, page=page, per_page=per_page,
+                       max_per_page=MAX_PAGE_SIZE, error_out=False)
+
+
+def leads_page(page=1, per_page=LEADS_PAGE_SIZE):
+    """Satu halaman lead terbaru beserta nama & email prospeknya."""
+    stmt = (
+        select(MarketingLead)
+        .options(
+            load_only(MarketingLead.stage, MarketingLead.created_at),
+            joinedload(MarketingLead.prospect).load_only(
+                MarketingProspect.client_name, MarketingProspect.email
+            ),
+        )
+        .order_by(MarketingLead.created_at.desc(), MarketingLead.id.desc())
+    )
+    return _paginate(stmt, page, per_page)
+
+
+def prospect_options():
+    """Pilihan prospek untuk form lead: hanya id, nama, perusahaan."""
+    return db.session.execute(
+        select(MarketingProspect.id, MarketingProspect.client_name, MarketingProspect.company)
+        .order_by(MarketingProspect.client_name.asc())
+    ).all()
+
+
+def projects_page(page=1, per_page=PROJECTS_PAGE_SIZE):
+    """Satu halaman proyek (terbaru dulu) dengan prospek & follow-up-nya.
+
+    MarketingProject tidak punya created_at; id yang naik berurutan
+    dipakai sebagai urutan waktu input.
+    """
+    stmt = (
+        select(MarketingProject)
+        .options(
+            load_only(MarketingProject.project_name, MarketingProject.status,
+                      MarketingProject.budget, MarketingProject.start_date,
+                      MarketingProject.end_date),
+            joinedload(MarketingProject.lead)
+            .load_only(MarketingLead.stage)
+            .joinedload(MarketingLead.prospect)
+            .load_only(MarketingProspect.client_name),
+            selectinload(MarketingProject.followups).load_only(MarketingFollowUp.date),
+        )
+        .order_by(MarketingProject.id.desc())
+    )
+    return _paginate(stmt, page, per_page)
+
+
+def recent_followups(limit=RECENT_FOLLOWUPS):
+    """Follow-up terakhir beserta nama proyeknya."""
+    return db.session.execute(
+        select(MarketingFollowUp.date, MarketingFollowUp.contact_person,
+               MarketingFollowUp.method, MarketingFollowUp.result,
+               MarketingProject.project_name)
+        .outerjoin(MarketingProject, MarketingFollowUp.project_id == MarketingProject.id)
+        .order_by(MarketingFollowUp.date.desc(), MarketingFollowUp.id.desc())
+        .limit(limit)
+    ).all()
+
+
+def offer_letter_candidates():
+    """Client & prospek yang bisa dipilih untuk surat penawaran massal."""
+    clients = db.session.execute(
+        select(MarketingClient.id, MarketingClient.name, MarketingClient.company)
+        .order_by(MarketingClient.company.asc(), MarketingClient.id.asc())
+    ).all()
+    prospects = db.session.execute(
+        select(MarketingProspect.id, MarketingProspect.client_name, MarketingProspect.company)
+        .order_by(MarketingProspect.company.asc(), MarketingProspect.id.asc())
+    ).all()
+    return clients, prospects
+
+
+def offer_letter_recipients(client_ids=(), prospect_ids=()):
+    """Tujuan surat (company_name, company_address) untuk client/prospek terpilih."""
+    recipients = []
+    if client_ids:
+        rows = db.session.execute(
+            select(MarketingClient.company, MarketingClient.name, MarketingClient.address)
+            .where(MarketingClient.id.in_(client_ids))
+            .order_by(MarketingClient.company.asc(), MarketingClient.id.asc())
+        )
+        recipients += [(company or name, address or "-") for company, name, address in rows]
+    if prospect_ids:
+        # prospek tidak punya kolom alamat
+        rows = db.session.execute(
+            select(MarketingProspect.company, MarketingProspect.client_name)
+            .where(MarketingProspect.id.in_(prospect_ids))
+            .order_by(MarketingProspect.company.asc(), MarketingProspect.id.asc())
+        )
+        recipients += [(company or name, "-") for company, name in rows]
+    return recipients
+
+
+@contextmanager
+def count_statements():
+    """Hitung statement SQL yang dieksekusi di dalam blok `with`.
+
+    Yield list berisi SQL tiap statement; len() = jumlah statement.
+    """
+    executed = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield executed
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+# === Funnel ===
+FUNNEL_STAGES = [
+    ("prospect", "Prospek"),
+    ("lead", "Lead"),
+    ("project", "Proyek"),
+    ("followup", "Follow-up"),
+]
+_STAT_FIELDS = ("total", "converted", "value", "days_sum", "days_count")
+
+
+def _days_between(start, end):
+    """Selisih hari (pecahan) start -> end; None bila salah satu kosong atau
+    negatif (mis. start_date proyek diisi mundur) agar tidak ikut dirata-rata."""
+    if start is None or end is None:
+        return None
+    if not isinstance(start, datetime):
+        start = datetime.combine(start, time())
+    if not isinstance(end, datetime):
+        end = datetime.combine(end, time())
+    days = (end - start).total_seconds() / 86400
+    return days if days >= 0 else None
+
+
+def _julian_days(start, end):
+    """Versi SQL _days_between: NULL bila kosong atau negatif (tidak dihitung count())."""
+    days = func.julianday(end) - func.julianday(start)
+    return case((days >= 0, days), else_=None)
+
+
+def _first_child(model, parent_fk):
+    """Subquery anak pertama (id terkecil) per induk."""
+    first = (select(parent_fk.label("parent_id"), func.min(model.id).label("first_id"))
+             .group_by(parent_fk).subquery())
+    child = aliased(model)
+    return first, child
+
+
+def _stage_rows():
+    """Hitung ulang seluruh funnel: satu query ber-GROUP BY per tahap.
+
+    Yield (stage, label, total, converted, value, days_sum, days_count).
+    """
+    P, L, J, F = MarketingProspect, MarketingLead, MarketingProject, MarketingFollowUp
+    plans = []
+
+    first, lead = _first_child(L, L.prospect_id)
+    days = _julian_days(P.created_at, lead.created_at)
+    plans.append(("prospect", P, func.coalesce(P.status, ""), first.c.parent_id,
+                  None, days, [(first, first.c.parent_id == P.id),
+                               (lead, lead.id == first.c.first_id)]))
+
+    first, project = _first_child(J, J.lead_id)
+    days = _julian_days(L.created_at, project.start_date)
+    plans.append(("lead", L, func.coalesce(L.stage, ""), first.c.parent_id,
+                  L.estimated_value, days, [(first, first.c.parent_id == L.id),
+                                            (project, project.id == first.c.first_id)]))
+
+    first, followup = _first_child(F, F.project_id)
+    days = _julian_days(J.start_date, followup.date)
+    plans.append(("project", J, func.coalesce(J.status, ""), first.c.parent_id,
+                  J.budget, days, [(first, first.c.parent_id == J.id),
+                                   (followup, followup.id == first.c.first_id)]))
+
+    for stage, model, label, converted, value, days, joins in plans:
+        stmt = select(
+            label, func.count(model.id), func.count(converted),
+            func.coalesce(func.sum(value), 0.0) if value is not None else 0.0,
+            func.coalesce(func.sum(days), 0.0), func.count(days),
+        ).select_from(model)
+        for target, onclause in joins:
+            stmt = stmt.outerjoin(target, onclause)
+        for row in db.session.execute(stmt.group_by(label)):
+            yield (stage, *row)
+
+    total = db.session.scalar(select(func.count(F.id)))
+    yield ("followup", "", total, 0, 0.0, 0.0, 0)
+
+
+def rebuild_funnel():
+    """Ganti isi marketing_funnel_stats dengan hasil hitung penuh."""
+    db.session.execute(delete(MarketingFunnelStat))
+    now = datetime.utcnow()
+    seen = set()
+    for stage, label, *stats in _stage_rows():
+        seen.add(stage)
+        db.session.add(MarketingFunnelStat(stage=stage, label=label, updated_at=now,
+                                           **dict(zip(_STAT_FIELDS, stats))))
+    for stage, _ in FUNNEL_STAGES:
+        if stage not in seen:
+            # baris kosong sebagai penanda bahwa agregat sudah dibangun
+            db.session.add(MarketingFunnelStat(stage=stage, label="", total=0, converted=0,
+                                               value=0.0, days_sum=0.0, days_count=0,
+                                               updated_at=now))
+    db.session.flush()
+
+
+def _funnel_built():
+    return db.session.scalar(select(MarketingFunnelStat.id).limit(1)) is not None
+
+
+def _bump_funnel(stage, label, **stats):
+    """Tambahkan delta ke baris (stage, label); baris dibuat bila belum ada."""
+    values = {field: stats.get(field, 0) for field in _STAT_FIELDS}
+    values = {field: value or 0 for field, value in values.items()}
+    table = MarketingFunnelStat.__table__
+    stmt = sqlite_insert(table).values(stage=stage, label=label or "",
+                                       updated_at=datetime.utcnow(), **values)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.stage, table.c.label],
+        set_={**{field: table.c[field] + stmt.excluded[field] for field in _STAT_FIELDS},
+              "updated_at": stmt.excluded.updated_at},
+    ))
+
+
+def _record(bump_parent):
+    """Dekorator record_*: flush objek baru, bangun agregat penuh bila belum
+    pernah (sudah termasuk objek ini), selain itu terapkan delta-nya."""
+    @wraps(bump_parent)
+    def wrapper(obj):
+        db.session.flush()
+        if not _funnel_built():
+            rebuild_funnel()
+            return
+        bump_parent(obj)
+    return wrapper
+
+
+def _is_first_child(model, parent_fk, parent_id, child_id):
+    return not db.session.scalar(
+        select(model.id).where(parent_fk == parent_id, model.id != child_id).limit(1)
+    )
+
+
+@_record
+def record_prospect(prospect):
+    """Catat prospek baru ke funnel."""
+    _bump_funnel("prospect", prospect.status, total=1)
+
+
+@_record
+def record_lead(lead):
+    """Catat lead baru; prospek induknya terhitung konversi bila ini lead pertamanya."""
+    _bump_funnel("lead", lead.stage, total=1, value=lead.estimated_value)
+    prospect = lead.prospect
+    if prospect is not None and _is_first_child(MarketingLead, MarketingLead.prospect_id,
+                                                prospect.id, lead.id):
+        days = _days_between(prospect.created_at, lead.created_at)
+        _bump_funnel("prospect", prospect.status, converted=1,
+                     days_sum=days, days_count=int(days is not None))
+
+
+@_record
+def record_project(project):
+    """Catat proyek baru; lead induknya terhitung konversi bila ini proyek pertamanya."""
+    _bump_funnel("project", project.status, total=1, value=project.budget)
+    lead = project.lead
+    if lead is not None and _is_first_child(MarketingProject, MarketingProject.lead_id,
+                                            lead.id, project.id):
+        days = _days_between(lead.created_at, project.start_date)
+        _bump_funnel("lead", lead.stage, converted=1,
+                     days_sum=days, days_count=int(days is not None))
+
+
+@_record
+def record_followup(followup):
+    """Catat follow-up baru; proyeknya terhitung konversi bila ini follow-up pertamanya."""
+    _bump_funnel("followup", "", total=1)
+    project = followup.project
+    if project is not None and _is_first_child(MarketingFollowUp, MarketingFollowUp.project_id,
+                                               project.id, followup.id):
+        days = _days_between(project.start_date, followup.date)
+        _bump_funnel("project", project.status, converted=1,
+                     days_sum=days, days_count=int(days is not None))
+
+
+def funnel_summary():
+    """KPI funnel untuk dashboard, dibaca dari tabel agregat saja."""
+    if not _funnel_built():
+        rebuild_funnel()
+        db.session.commit()
+    rows = db.session.execute(select(MarketingFunnelStat)).scalars().all()
+
+    stages = []
+    last = FUNNEL_STAGES[-1][0]
+    for key, title in FUNNEL_STAGES:
+        own = [r for r in rows if r.stage == key]
+        sums = {field: sum(getattr(r, field) for r in own) for field in _STAT_FIELDS}
+        stages.append({
+            "key": key,
+            "title": title,
+            **sums,
+            "conversion": (sums["converted"] / sums["total"]
+                           if sums["total"] and key != last else None),
+            "avg_days": sums["days_sum"] / sums["days_count"] if sums["days_count"] else None,
+            "labels": sorted(((r.label or "-", r.total, r.value) for r in own if r.total),
+                             key=lambda item: -item[1]),
+        })
+    prospects = stages[0]["total"]
+    closing = sum(total for label, total, _ in stages[1]["labels"] if label == "Closing")
+    return {
+        "stages": stages,
+        "pipeline_value": stages[1]["value"],
+        "project_value": stages[2]["value"],
+        "overall_conversion": stages[2]["total"] / prospects if prospects else None,
+        "closing": closing,
+        "updated_at": max((r.updated_at for r in rows if r.updated_at), default=None),
+    }
+
+
+# === Deteksi duplikat client / prospek ===
+DUPLICATE_THRESHOLD = 0.6  # skor Dice trigram minimal untuk saran saat input
+MERGE_THRESHOLD = 0.75  # lebih ketat untuk pengelompokan/penggabungan massal
+DUPLICATE_LIMIT = 5
+FTS_CANDIDATES = 50
+# bentuk badan usaha & kata umum yang tidak membedakan perusahaan
+_LEGAL_FORMS = {"pt", "cv", "ud", "pd", "fa", "tbk", "persero", "perum", "ltd", "inc", "co", "corp"}
+
+_name_fts_available = None
+
+
+def name_fts_available():
+    """True bila tabel marketing_name_fts (migrasi FTS5 trigram) ada. Dicek sekali per proses."""
+    global _name_fts_available
+    if _name_fts_available is None:
+        _name_fts_available = db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'marketing_name_fts'"
+        )).first() is not None if db.engine.dialect.name == "sqlite" else False
+    return _name_fts_available
+
+
+def normalize_name(value):
+    """'PT. Maju-Jaya Abadi, Tbk' -> 'maju jaya abadi'."""
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(ch for ch in value if not unicodedata.combining(ch)).lower()
+    words = re.findall(r"[a-z0-9]+", value)
+    return " ".join(w for w in words if w not in _LEGAL_FORMS)
+
+
+def _trigrams(key):
+    """Trigram per kata dengan padding ala pg_trgm ('  maju ' -> '  m', ' ma', ...)."""
+    grams = set()
+    for word in key.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _similarity(a, b):
+    """Koefisien Dice dua himpunan trigram (0..1)."""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _entity_key(company_key, name_key):
+    # duplikat dinilai dari nama perusahaan; nama orang hanya bila perusahaan kosong
+    return company_key or name_key
+
+
+def _key_values(kind, target):
+    if kind == "client":
+        company, name = target.company, target.name
+    else:
+        company, name = target.company, target.client_name
+    return {"kind": kind, "ref_id": target.id,
+            "company_key": normalize_name(company), "name_key": normalize_name(name)}
+
+
+def _name_index_built(connection=None):
+    stmt = select(MarketingNameKey.id).limit(1)
+    executor = connection if connection is not None else db.session
+    return executor.execute(stmt).first() is not None
+
+
+def reindex_names():
+    """Bangun ulang marketing_name_keys dari seluruh client & prospek."""
+    db.session.execute(delete(MarketingNameKey))
+    rows = [
+        *(_key_values("client", c) for c in db.session.execute(
+            select(MarketingClient).options(load_only(MarketingClient.name, MarketingClient.company))
+        ).scalars()),
+        *(_key_values("prospect", p) for p in db.session.execute(
+            select(MarketingProspect).options(load_only(MarketingProspect.client_name,
+                                                        MarketingProspect.company))
+        ).scalars()),
+    ]
+    if rows:
+        db.session.execute(insert(MarketingNameKey), rows)
+    db.session.flush()
+    return len(rows)
+
+
+def _ensure_name_index():
+    if not _name_index_built():
+        reindex_names()
+        db.session.commit()
+
+
+def _sync_name_key(kind):
+    """Listener mapper: jaga baris marketing_name_keys tetap sinkron.
+
+    Selama index belum pernah dibangun (tabel kosong) perubahan dilewati;
+    pembangunan penuh pertama sudah mencakup semuanya.
+    """
+    def after_insert(mapper, connection, target):
+        if _name_index_built(connection):
+            connection.execute(insert(MarketingNameKey).values(**_key_values(kind, target)))
+
+    def after_update(mapper, connection, target):
+        values = _key_values(kind, target)
+        connection.execute(
+            update(MarketingNameKey)
+            .where(MarketingNameKey.kind == kind, MarketingNameKey.ref_id == target.id)
+            .values(company_key=values["company_key"], name_key=values["name_key"])
+        )
+
+    def after_delete(mapper, connection, target):
+        connection.execute(delete(MarketingNameKey).where(
+            MarketingNameKey.kind == kind, MarketingNameKey.ref_id == target.id
+        ))
+
+    return after_insert, after_update, after_delete
+
+
+for _model, _kind in ((MarketingClient, "client"), (MarketingProspect, "prospect")):
+    for _evt, _fn in zip(("after_insert", "after_update", "after_delete"), _sync_name_key(_kind)):
+        event.listen(_model, _evt, _fn)
+
+
+def _fts_trigram_query(column, key):
+    """('company_key', 'maju jaya') -> 'company_key : ("maj" OR "aju" OR ...)'
+    (trigram mentah, sesuai tokenizer FTS5)."""
+    grams = {key[i:i + 3] for i in range(len(key) - 2)}
+    return f"{column} : (" + " OR ".join('"{}"'.format(g.replace('"', '""')) for g in sorted(grams)) + ")"
+
+
+def _describe(matches):
+    """Lengkapi (skor, kind, ref_id) dengan nama & perusahaan untuk ditampilkan."""
+    ids = defaultdict(list)
+    for _, kind, ref_id in matches:
+        ids[kind].append(ref_id)
+    names = {}
+    if ids["client"]:
+        for row in db.session.execute(select(MarketingClient.id, MarketingClient.name,
+                                             MarketingClient.company)
+                                      .where(MarketingClient.id.in_(ids["client"]))):
+            names["client", row.id] = (row.name, row.company)
+    if ids["prospect"]:
+        for row in db.session.execute(select(MarketingProspect.id, MarketingProspect.client_name,
+                                             MarketingProspect.company)
+                                      .where(MarketingProspect.id.in_(ids["prospect"]))):
+            names["prospect", row.id] = (row.client_name, row.company)
+    return [
+        {"kind": kind, "id": ref_id, "name": names[kind, ref_id][0],
+         "company": names[kind, ref_id][1], "score": round(score, 2)}
+        for score, kind, ref_id in matches if (kind, ref_id) in names
+    ]
+
+
+def find_duplicates(company=None, name=None, threshold=DUPLICATE_THRESHOLD,
+                    limit=DUPLICATE_LIMIT):
+    """Client/prospek yang kemungkinan sama dengan company/name yang diketik.
+
+    Kandidat diambil dari index trigram FTS5 (diurutkan bm25), lalu dinilai
+    ulang dengan skor Dice trigram; tanpa FTS5 hanya nama normal yang persis.
+    """
+    _ensure_name_index()
+    company_key = normalize_name(company)
+    key = _entity_key(company_key, normalize_name(name))
+    if not key:
+        return []
+    column = "company_key" if company_key else "name_key"
+
+    K = MarketingNameKey
+    if name_fts_available() and len(key) >= 3:
+        candidates = db.session.execute(
+            text("SELECT k.kind, k.ref_id, k.company_key, k.name_key "
+                 "FROM marketing_name_fts JOIN marketing_name_keys k ON k.id = marketing_name_fts.rowid "
+                 "WHERE marketing_name_fts MATCH :match ORDER BY rank LIMIT :limit"),
+            {"match": _fts_trigram_query(column, key), "limit": FTS_CANDIDATES},
+        ).all()
+    else:
+        candidates = db.session.execute(
+            select(K.kind, K.ref_id, K.company_key, K.name_key)
+            .where(db.or_(K.company_key == key, db.and_(K.company_key == "", K.name_key == key)))
+            .limit(FTS_CANDIDATES)
+        ).all()
+
+    grams = _trigrams(key)
+    scored = sorted(
+        ((_similarity(grams, _trigrams(_entity_key(c.company_key, c.name_key))), c.kind, c.ref_id)
+         for c in candidates),
+        reverse=True,
+    )
+    return _describe([m for m in scored if m[0] >= threshold][:limit])
+
+
+def duplicate_clusters(threshold=MERGE_THRESHOLD, max_df=0.01):
+    """Kelompokkan semua client & prospek yang saling mirip.
+
+    Tanpa membandingkan semua pasangan (O(n²)): index terbalik trigram ->
+    entri dibangun di memori, jumlah trigram bersama dihitung per kandidat,
+    dan skor Dice hanya dihitung untuk kandidat yang masih mungkin lolos
+    threshold. Trigram yang terlalu umum (muncul di > max_df bagian entri,
+    mis. '  m' atau 'ya ') tidak dipakai untuk mencari kandidat. Return list
+    cluster, tiap cluster list dict (urut id) berukuran >= 2.
+    """
+    _ensure_name_index()
+    K = MarketingNameKey
+    entries = db.session.execute(select(K.kind, K.ref_id, K.company_key, K.name_key)).all()
+    keys = [_entity_key(e.company_key, e.name_key) for e in entries]
+    grams = [_trigrams(k) for k in keys]
+
+    parent = list(range(len(entries)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        parent[find(i)] = find(j)
+
+    # nama normal yang persis sama langsung satu cluster
+    by_key = {}
+    for i, key in enumerate(keys):
+        if key:
+            if key in by_key:
+                union(i, by_key[key])
+            else:
+                by_key[key] = i
+
+    postings = defaultdict(list)
+    for i, g in enumerate(grams):
+        for gram in g:
+            postings[gram].append(i)
+    cap = max(50, int(len(entries) * max_df))
+    for i, g in enumerate(grams):
+        shared = Counter()
+        skipped = 0
+        for gram in g:
+            ids = postings[gram]
+            if len(ids) > cap:
+                skipped += 1  # trigram umum: mungkin dimiliki bersama, tidak dihitung
+                continue
+            shared.update(ids)
+        for j, count in shared.items():
+            # batas atas Dice: semua trigram umum dianggap ikut cocok
+            if (j > i and 2 * (count + skipped) >= threshold * (len(g) + len(grams[j]))
+                    and find(i) != find(j) and _similarity(g, grams[j]) >= threshold):
+                union(i, j)
+
+    groups = defaultdict(list)
+    for i in range(len(entries)):
+        groups[find(i)].append(i)
+    members = [i for group in groups.values() if len(group) > 1 for i in group]
+    described = {(m["kind"], m["id"]): m
+                 for m in _describe([(1.0, entries[i].kind, entries[i].ref_id) for i in members])}
+    clusters = []
+    for group in groups.values():
+        cluster = [described[key] for key in sorted((entries[i].kind, entries[i].ref_id)
+                                                    for i in group) if key in described]
+        if len(cluster) > 1:
+            clusters.append([{k: v for k, v in m.items() if k != "score"} for m in cluster])
+    return sorted(clusters, key=len, reverse=True)
+
+
+def merge_duplicates(cluster):
+    """Gabungkan anggota cluster per jenis ke record dengan id terkecil.
+
+    Lead milik prospek duplikat dipindah ke prospek utama, kolom kosong di
+    record utama diisi dari duplikatnya, lalu duplikat dihapus. Client dan
+    prospek tidak digabung satu sama lain. Return jumlah record yang dihapus.
+    """
+    removed = 0
+    for kind, model, fields in (
+        ("client", MarketingClient, ("phone", "address")),
+        ("prospect", MarketingProspect, ("company", "contact", "email", "source")),
+    ):
+        ids = sorted(m["id"] for m in cluster if m["kind"] == kind)
+        if len(ids) < 2:
+            continue
+        keep_id, dup_ids = ids[0], ids[1:]
+        if kind == "prospect":
+            db.session.execute(
+                update(MarketingLead).where(MarketingLead.prospect_id.in_(dup_ids))
+                .values(prospect_id=keep_id).execution_options(synchronize_session=False)
+            )
+            db.session.expire_all()
+        keep = db.session.get(model, keep_id)
+        for dup in db.session.execute(select(model).where(model.id.in_(dup_ids))).scalars():
+            for field in fields:
+                if not getattr(keep, field) and getattr(dup, field):
+                    setattr(keep, field, getattr(dup, field))
+            db.session.delete(dup)
+            removed += 1
+    db.session.flush()
+    return removed
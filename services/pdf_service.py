@@ -0,0 +1,310 @@
+# services/pdf_service.py
+"""Render PDF (WeasyPrint) di process pool dengan cache di disk.
+
+HTML tetap dirender di request (butuh url_for/current_user); hanya
+write_pdf yang berat yang dikirim ke proses pekerja. Tiap pekerja menyimpan
+FontConfiguration, stylesheet dasar static/css/pdf.css yang sudah di-parse,
+dan sumber daya yang sudah diambil (font, logo) selama hidupnya, jadi tidak
+diunduh & di-parse ulang setiap dokumen.
+
+File hasil disimpan sebagai <key>.pdf di PDF_CACHE_DIR; key dibentuk dari
+nama template + parameter + versi data tabel sumber, sehingga unduhan ulang
+dokumen yang sama langsung dilayani dari disk sampai datanya berubah.
+Key bisa ditebak, jadi tidak pernah dipakai langsung di URL: /pdf/ menerima
+token bertanda tangan (pdf_token) berisi key + role yang boleh mengunduh.
+Status job juga berupa file (<key>.pending / <key>.error) agar terbaca dari
+semua proses gunicorn. Batch (banyak dokumen sekaligus) dicatat sebagai
+manifest batch-<id>.json berisi daftar key + nama file; progresnya dihitung
+dari status tiap key.
+"""
+import hashlib
+import json
+import os
+import secrets
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from threading import Lock
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from holycity.data_version import get_version
+from services.export_service import stream_zip
+
+PENDING_TTL = 600  # detik; penanda .pending lebih tua dari ini dianggap job hilang
+CACHE_TTL = 7 * 24 * 3600  # detik; PDF versi data lama dihapus setelah ini
+PRUNE_INTERVAL = 3600
+
+_last_prune = 0.0
+
+_pool = None
+_pool_lock = Lock()
+
+
+# === Sisi proses pekerja ===
+PDF_STYLESHEET = os.path.join("css", "pdf.css")  # relatif ke folder static
+
+_font_config = None
+_static_dir = None
+_stylesheets = []  # CSS dasar yang sudah di-parse, dipakai semua dokumen
+_resources = {}  # url -> hasil url_fetcher, hidup selama proses pekerja
+
+
+def _init_worker(static_dir):
+    global _font_config, _static_dir, _stylesheets
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+    _font_config = FontConfiguration()
+    _static_dir = static_dir
+    path = os.path.join(static_dir, PDF_STYLESHEET)
+    if os.path.exists(path):
+        _stylesheets = [CSS(filename=path, font_config=_font_config)]
+
+
+def _fetch(url):
+    """url_fetcher WeasyPrint dengan cache per pekerja; /static/ dibaca
+    langsung dari disk, bukan lewat HTTP ke aplikasi sendiri."""
+    if url not in _resources:
+        from weasyprint import default_url_fetcher
+        target, marker = url, "/static/"
+        if _static_dir and marker in url and url.startswith(("http://", "https://")):
+            path = os.path.join(_static_dir, url.split(marker, 1)[1].split("?", 1)[0])
+            target = "file://" + os.path.abspath(path)
+        result = default_url_fetcher(target)
+        if "file_obj" in result:
+            result["string"] = result.pop("file_obj").read()
+        _resources[url] = result
+    return dict(_resources[url])
+
+
+def _write_pdf(html, base_url, path):
+    from weasyprint import HTML
+    tmp = f"{path}.{os.getpid()}.tmp"
+    HTML(string=html, base_url=base_url, url_fetcher=_fetch).write_pdf(
+        tmp, stylesheets=_stylesheets, font_config=_font_config
+    )
+    os.replace(tmp, path)  # atomik: pembaca tidak pernah melihat file setengah jadi
+    return path
+
+
+# === Sisi aplikasi ===
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=current_app.config["PDF_WORKERS"],
+                initializer=_init_worker,
+                initargs=(current_app.static_folder,),
+            )
+        return _pool
+
+
+def _cache_dir():
+    path = current_app.config["PDF_CACHE_DIR"]
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def pdf_key(template, params, tables=()):
+    """Kunci cache: template + parameter + versi data tabel sumber."""
+    raw = json.dumps({
+        "template": template,
+        "params": params,
+        "version": get_version(*tables) if tables else "",
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _token_serializer():
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt="pdf-download")
+
+
+def pdf_token(key, roles=None):
+    """Token unduhan untuk /pdf/<token>; roles=None berarti semua user login."""
+    return _token_serializer().dumps({"key": key, "roles": list(roles) if roles else None})
+
+
+def read_pdf_token(token):
+    """(key, roles) dari token, atau (None, None) bila tanda tangan tidak sah."""
+    try:
+        data = _token_serializer().loads(token)
+        return data["key"], data["roles"]
+    except (BadSignature, KeyError, TypeError):
+        return None, None
+
+
+def pdf_path(key):
+    return os.path.join(_cache_dir(), f"{key}.pdf")
+
+
+def pdf_status(key):
+    """'done' / 'pending' / 'failed' (dengan pesan) / None bila tidak dikenal."""
+    base = os.path.join(_cache_dir(), key)
+    if os.path.exists(base + ".pdf"):
+        return "done", None
+    if os.path.exists(base + ".error"):
+        with open(base + ".error", encoding="utf-8") as f:
+            return "failed", f.read()
+    try:
+        if time.time() - os.path.getmtime(base + ".pending") < PENDING_TTL:
+            return "pending", None
+    except OSError:
+        pass
+    return None, None
+
+
+def _finish(key, future):
+    base = os.path.join(_cache_dir(), key)
+    error = future.exception()
+    if error is not None:
+        with open(base + ".error", "w", encoding="utf-8") as f:
+            f.write(str(error))
+    try:
+        os.remove(base + ".pending")
+    except OSError:
+        pass
+
+
+def _prune(cache_dir):
+    """Hapus file cache kedaluwarsa, paling sering sekali per PRUNE_INTERVAL."""
+    global _last_prune
+    now = time.time()
+    if now - _last_prune < PRUNE_INTERVAL:
+        return
+    _last_prune = now
+    for entry in os.scandir(cache_dir):
+        try:
+            if now - entry.stat().st_mtime > CACHE_TTL:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def submit_pdf(key, render_html, base_url=None):
+    """Antrikan render PDF untuk key bila belum ada/sedang dibuat.
+
+    render_html: callable tanpa argumen yang menghasilkan HTML; hanya
+    dipanggil bila PDF memang perlu dibuat. Return Future, atau None bila
+    PDF sudah ada / sedang dikerjakan.
+    """
+    status, _ = pdf_status(key)
+    if status in ("done", "pending"):
+        return None
+
+    _prune(_cache_dir())
+    base = os.path.join(_cache_dir(), key)
+    if status == "failed":
+        os.remove(base + ".error")
+    try:
+        # O_EXCL: hanya satu request yang memulai render untuk key yang sama
+        os.close(os.open(base + ".pending", os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        if pdf_status(key)[0] == "pending":
+            return None
+        os.utime(base + ".pending")  # penanda kedaluwarsa: ambil alih
+
+    try:
+        html = render_html()
+        future = _get_pool().submit(_write_pdf, html, base_url, base + ".pdf")
+    except Exception:
+        os.remove(base + ".pending")
+        raise
+    app = current_app._get_current_object()
+
+    def done(f):
+        with app.app_context():
+            _finish(key, f)
+
+    future.add_done_callback(done)
+    return future
+
+
+def render_pdf(key, render_html, base_url=None, wait=None):
+    """Pastikan PDF untuk key tersedia, tunggu paling lama `wait` detik
+    (default PDF_SYNC_WAIT). Return status setelah menunggu."""
+    future = submit_pdf(key, render_html, base_url)
+    if future is not None:
+        try:
+            future.result(timeout=current_app.config["PDF_SYNC_WAIT"] if wait is None else wait)
+        except TimeoutError:
+            return "pending"
+        except Exception:
+            _finish(key, future)  # catat sekarang, jangan tunggu callback
+    status = pdf_status(key)[0]
+    return status or "pending"
+
+
+def html_to_pdf(html, base_url=None):
+    """Render HTML ke bytes PDF di process pool (tanpa cache), blocking."""
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=_cache_dir())
+    os.close(fd)
+    try:
+        _get_pool().submit(_write_pdf, html, base_url, path).result()
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+# === Batch ===
+def _batch_path(batch_id):
+    return os.path.join(_cache_dir(), f"batch-{batch_id}.json")
+
+
+def submit_batch(jobs, base_url=None):
+    """Antrikan banyak PDF sekaligus. jobs: iterable (key, render_html, filename).
+
+    Semua dokumen dikerjakan paralel oleh process pool. Return batch_id acak
+    (tidak bisa ditebak dari isinya) untuk batch_status() / stream_batch_zip().
+    """
+    entries, names = [], set()
+    for key, render_html, filename in jobs:
+        submit_pdf(key, render_html, base_url)
+        stem, ext = os.path.splitext(filename)
+        name, n = filename, 1
+        while name in names:  # nama file kembar dalam satu arsip
+            n += 1
+            name = f"{stem}_{n}{ext}"
+        names.add(name)
+        entries.append([key, name])
+
+    batch_id = secrets.token_hex(32)
+    path = _batch_path(batch_id)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"created_at": time.time(), "entries": entries}, f)
+    os.replace(tmp, path)
+    return batch_id
+
+
+def _batch_entries(batch_id):
+    try:
+        with open(_batch_path(batch_id), encoding="utf-8") as f:
+            return json.load(f)["entries"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def batch_status(batch_id):
+    """Progres batch: dict total/done/failed/pending + daftar error, atau None."""
+    entries = _batch_entries(batch_id)
+    if entries is None:
+        return None
+    counts = {"done": 0, "failed": 0, "pending": 0}
+    errors = []
+    for key, name in entries:
+        status, error = pdf_status(key)
+        if status is None:  # penanda hilang/kedaluwarsa tanpa hasil
+            status, error = "failed", "job hilang, buat ulang batch"
+        counts[status] += 1
+        if status == "failed":
+            errors.append((name, error))
+    return {"total": len(entries), **counts, "errors": errors,
+            "finished": counts["pending"] == 0}
+
+
+def stream_batch_zip(batch_id):
+    """Generator bytes ZIP berisi semua PDF batch yang sudah jadi."""
+    entries = _batch_entries(batch_id) or []
+    files = [(name, pdf_path(key)) for key, name in entries]
+    return stream_zip((name, path) for name, path in files if os.path.exists(path))
@@ -0,0 +1,182 @@
+# services/report_service.py
+"""Laporan HRD yang dihitung di latar belakang.
+
+Setiap laporan adalah fungsi query set-based yang menghasilkan
+(judul, kolom, baris). Hasil render (html / csv / pdf) disimpan di
+report_results dengan kunci laporan + parameter + format + stempel versi
+data tabel sumbernya; permintaan berikutnya langsung memakai hasil itu
+sampai data sumber berubah.
+"""
+import csv
+import io
+import json
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from models import db, Employee, Performance, AttendanceDaily, ReportResult
+from holycity import tasks
+from holycity.data_version import get_version
+from services.hrd_service import PAYROLL_UTC_OFFSET, WORK_START
+from services.pdf_service import html_to_pdf
+
+FORMATS = {
+    "html": "text/html; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "pdf": "application/pdf",
+}
+STALE_PENDING = timedelta(minutes=10)  # job pending lebih lama dari ini dianggap hilang
+
+
+def _month_range(month):
+    year, mon = (int(part) for part in month.split("-"))
+    return date(year, mon, 1), date(year, mon, monthrange(year, mon)[1])
+
+
+# === Definisi laporan ===
+def attendance_matrix(month):
+    """Matriks kehadiran: karyawan x tanggal (H = hadir, I = izin)."""
+    first, last = _month_range(month)
+    rows = (db.session.query(Employee.id, Employee.name, AttendanceDaily.day, AttendanceDaily.status)
+            .join(Employee, Employee.id == AttendanceDaily.employee_id)
+            .filter(AttendanceDaily.day >= first, AttendanceDaily.day <= last)
+            .order_by(Employee.name, Employee.id)
+            .all())
+    days = list(range(1, last.day + 1))
+    matrix = {}
+    for emp_id, name, day, status in rows:
+        matrix.setdefault((emp_id, name), {})[day.day] = status[0]
+    body = [
+        [name, *(marks.get(d, "") for d in days),
+         sum(1 for m in marks.values() if m == "H")]
+        for (_, name), marks in matrix.items()
+    ]
+    return f"Matriks Kehadiran {month}", ["Karyawan", *map(str, days), "Total Hadir"], body
+
+
+def tardiness_ranking(month):
+    """Peringkat keterlambatan: jumlah hari & total menit terlambat."""
+    first, last = _month_range(month)
+    rows = (db.session.query(Employee.id, Employee.name, AttendanceDaily.first_in)
+            .join(Employee, Employee.id == AttendanceDaily.employee_id)
+            .filter(AttendanceDaily.day >= first, AttendanceDaily.day <= last,
+                    AttendanceDaily.first_in.isnot(None))
+            .all())
+    totals = {}
+    for emp_id, name, first_in in rows:
+        local = first_in + PAYROLL_UTC_OFFSET
+        late = int((local - datetime.combine(local.date(), WORK_START)).total_seconds() // 60)
+        if late > 0:
+            days, minutes = totals.get((emp_id, name), (0, 0))
+            totals[(emp_id, name)] = (days + 1, minutes + late)
+    ranking = sorted(totals.items(), key=lambda item: (-item[1][1], item[0][1]))
+    body = [[i, name, days, minutes, round(minutes / days, 1)]
+            for i, ((_, name), (days, minutes)) in enumerate(ranking, start=1)]
+    return (f"Peringkat Keterlambatan {month}",
+            ["#", "Karyawan", "Hari Terlambat", "Total Menit", "Rata-rata Menit"], body)
+
+
+def performance_by_department(period):
+    """Rata-rata, minimum & maksimum nilai kinerja per departemen."""
+    rows = (db.session.query(
+                func.coalesce(Employee.department, "-"),
+                func.count(Performance.id),
+                func.avg(Performance.score),
+                func.min(Performance.score),
+                func.max(Performance.score))
+            .join(Employee, Employee.id == Performance.employee_id)
+            .filter(Performance.period == period)
+            .group_by(Employee.department)
+            .order_by(func.avg(Performance.score).desc())
+            .all())
+    body = [[dept, n, round(avg, 2), mn, mx] for dept, n, avg, mn, mx in rows]
+    return (f"Kinerja per Departemen {period}",
+            ["Departemen", "Jumlah Penilaian", "Rata-rata", "Terendah", "Tertinggi"], body)
+
+
+REPORTS = {
+    "attendance_matrix": {
+        "title": "Matriks Kehadiran Bulanan", "func": attendance_matrix,
+        "param": "month", "tables": ("attendance_daily", "employees"),
+    },
+    "tardiness": {
+        "title": "Peringkat Keterlambatan", "func": tardiness_ranking,
+        "param": "month", "tables": ("attendance_daily", "employees"),
+    },
+    "performance_by_department": {
+        "title": "Kinerja per Departemen", "func": performance_by_department,
+        "param": "period", "tables": ("performance", "employees"),
+    },
+}
+
+
+# === Render ===
+def render_report(name, params, fmt):
+    """Hitung laporan lalu render ke bytes sesuai format."""
+    title, columns, rows = REPORTS[name]["func"](**params)
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(columns)
+        writer.writerows(rows)
+        return buf.getvalue().encode("utf-8-sig")
+
+    # dirender di worker tanpa request: pakai jinja_env langsung (tanpa context processor)
+    template = current_app.jinja_env.get_template("hrd/report_output.html")
+    html = template.render(title=title, columns=columns, rows=rows,
+                           generated_at=datetime.utcnow() + PAYROLL_UTC_OFFSET)
+    if fmt == "pdf":
+        return html_to_pdf(html)
+    return html.encode("utf-8")
+
+
+def run_report_job(result_id):
+    """Dijalankan di worker latar: render lalu simpan ke report_results."""
+    result = db.session.get(ReportResult, result_id)
+    if result is None or result.status == "done":
+        return
+    try:
+        content = render_report(result.report, json.loads(result.params), result.format)
+    except Exception as e:
+        db.session.rollback()
+        result.status, result.error = "failed", str(e)
+    else:
+        result.status, result.content = "done", content
+        # hasil untuk versi data lama tidak akan dipakai lagi
+        ReportResult.query.filter(
+            ReportResult.report == result.report,
+            ReportResult.params == result.params,
+            ReportResult.format == result.format,
+            ReportResult.data_version != result.data_version,
+        ).delete(synchronize_session=False)
+    result.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def request_report(name, params, fmt, retry=False):
+    """Ambil hasil laporan; bila belum ada untuk versi data sekarang,
+    antrikan job. Return ReportResult (cek .status)."""
+    key = json.dumps(params, sort_keys=True)
+    version = get_version(*REPORTS[name]["tables"])
+    lookup = dict(report=name, params=key, format=fmt, data_version=version)
+    result = ReportResult.query.filter_by(**lookup).first()
+
+    stale = (result is not None and result.status == "pending"
+             and result.created_at < datetime.utcnow() - STALE_PENDING)
+    if result is not None and (stale or (retry and result.status == "failed")):
+        db.session.delete(result)
+        db.session.commit()
+        result = None
+
+    if result is None:
+        result = ReportResult(**lookup, status="pending")
+        db.session.add(result)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # request lain sudah mengantrikan job yang sama
+            db.session.rollback()
+            return ReportResult.query.filter_by(**lookup).first()
+        tasks.submit(run_report_job, result.id)
+    return result
@@ -0,0 +1,85 @@
+# services/upload_service.py
+"""Penyimpanan upload berbasis isi (content-addressed).
+
+File disimpan dengan nama SHA-256 isinya dalam susunan fan-out
+<namespace>/ab/cd/<hash>.<ext>, sehingga:
+- upload ulang file yang identik tidak menambah file baru (dedupe);
+- tidak ada satu folder berisi puluhan ribu file;
+- isi di balik sebuah nama tidak pernah berubah, jadi aman di-cache
+  browser selamanya (immutable).
+
+Upload dibaca per potongan sambil di-hash dan ditulis ke file sementara;
+batas ukuran dicek per potongan, bukan setelah seluruh body dibuffer.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+CHUNK_SIZE = 64 * 1024
+HASHED_NAME = re.compile(r"^(?:[a-z]+/)?[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+$")
+
+# batas per namespace: ukuran maksimum (byte) & ekstensi yang diterima
+NAMESPACES = {
+    "absensi": {"max_bytes": 8 * 1024 * 1024, "ext": {"jpg", "jpeg", "png", "webp", "heic"}},
+    "accounting": {"max_bytes": 10 * 1024 * 1024, "ext": {"jpg", "jpeg", "png", "webp", "pdf"}},
+}
+
+
+def store_root(namespace):
+    return os.path.join(current_app.config["UPLOAD_STORE_DIR"], namespace)
+
+
+def is_stored_name(name):
+    """True bila name adalah nama content-addressed dari store ini
+    (termasuk turunan seperti 'thumb/ab/cd/<hash>.webp')."""
+    return bool(name and HASHED_NAME.match(name))
+
+
+def stored_path(namespace, name):
+    return os.path.join(store_root(namespace), name)
+
+
+def save_upload(file, namespace):
+    """Simpan FileStorage ke store. Return nama relatif 'ab/cd/<hash>.<ext>'.
+
+    Raise ValueError (pesan untuk user) bila ekstensi tidak diterima atau
+    ukuran melewati batas namespace.
+    """
+    spec = NAMESPACES[namespace]
+    ext = os.path.splitext(secure_filename(file.filename or ""))[1].lstrip(".").lower()
+    if ext not in spec["ext"]:
+        raise ValueError(f"Tipe file .{ext or '?'} tidak diizinkan.")
+    limit_mb = spec["max_bytes"] // (1024 * 1024)
+    if file.content_length and file.content_length > spec["max_bytes"]:
+        raise ValueError(f"Ukuran file melebihi {limit_mb} MB.")
+
+    root = store_root(namespace)
+    os.makedirs(root, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=root, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := file.stream.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > spec["max_bytes"]:
+                    raise ValueError(f"Ukuran file melebihi {limit_mb} MB.")
+                digest.update(chunk)
+                out.write(chunk)
+
+        hexdigest = digest.hexdigest()
+        name = f"{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}.{ext}"
+        path = os.path.join(root, name)
+        if os.path.exists(path):
+            os.remove(tmp)  # isi sama sudah tersimpan
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp, path)
+        return name
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,40 @@
+import os
+import sqlite3
+
+import pytest
+from flask import Flask
+from flask_migrate import upgrade
+
+from holycity.extensions import db, migrate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATIONS_DIR = os.path.join(ROOT, "migrations")
+# company.db di repo = skema dasar (sebelum Alembic) pada revisi pertama
+BASE_DB = os.path.join(ROOT, "company.db")
+
+
+def _base_schema():
+    with sqlite3.connect(f"file:{BASE_DB}?mode=ro", uri=True) as conn:
+        ddl = [sql for (sql,) in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'")]
+        (version,) = conn.execute("SELECT version_num FROM alembic_version").fetchone()
+    return ddl, version
+
+
+@pytest.fixture
+def app():
+    """App minimal dengan SQLite in-memory: skema dasar dari company.db lalu
+    seluruh migrasi dijalankan, sehingga index yang diuji sama dengan produksi."""
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", TESTING=True)
+    db.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
+    ddl, version = _base_schema()
+    with app.app_context():
+        with db.engine.begin() as conn:
+            for sql in ddl:
+                conn.exec_driver_sql(sql)
+            conn.exec_driver_sql("INSERT INTO alembic_version VALUES (?)", (version,))
+        upgrade(directory=MIGRATIONS_DIR)
+        yield app
+        db.session.remove()
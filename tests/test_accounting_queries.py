@@ -0,0 +1,11 @@
+from services.accounting_service import explain_mutations
+
+
+def test_mutation_modes_use_index(app):
+    plans = explain_mutations()
+    assert set(plans) == {"all", "daily", "monthly", "yearly", "range", "category"}
+    for mode, details in plans.items():
+        for detail in details:
+            # "SCAN transactions" tanpa index = full table scan
+            assert not (detail.startswith("SCAN") and "INDEX" not in detail), (mode, details)
+            assert "USE TEMP B-TREE" not in detail, (mode, details)
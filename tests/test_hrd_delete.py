@@ -0,0 +1,73 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from models import db, Employee, Attendance, AttendanceDaily, Performance
+from services.hrd_service import archive_employee, delete_employee
+from services.marketing_service import count_statements
+
+SMALL, LARGE = 10, 2000
+
+
+def _seed_employee(days):
+    """Karyawan dengan `days` hari absensi (masuk + keluar), rekap harian dan
+    penilaian bulanan; baris anak dimasukkan massal agar seed tetap cepat."""
+    emp = Employee(name=f"Karyawan {days}", department="Ops", join_date=date(2020, 1, 1))
+    db.session.add(emp)
+    db.session.flush()
+    username = f"user{emp.id}"
+    start = date(2020, 1, 1)
+    attendance, daily = [], []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        check_in = datetime.combine(day, datetime.min.time()) + timedelta(hours=1)
+        for status, ts in (("Masuk", check_in), ("Keluar", check_in + timedelta(hours=9))):
+            attendance.append({"username": username, "status": status, "timestamp": ts,
+                               "day": day, "employee_id": emp.id})
+        daily.append({"username": username, "employee_id": emp.id, "day": day,
+                      "first_in": check_in, "last_out": check_in + timedelta(hours=9),
+                      "status": "Hadir", "minutes_worked": 540})
+    performance = [{"employee_id": emp.id, "period": f"{2020 + i // 12}-{i % 12 + 1:02d}",
+                    "score": 80.0} for i in range(days // 30 + 1)]
+    db.session.execute(insert(Attendance), attendance)
+    db.session.execute(insert(AttendanceDaily), daily)
+    db.session.execute(insert(Performance), performance)
+    db.session.commit()
+    return emp.id
+
+
+def _children(emp_id):
+    return [db.session.query(model).filter_by(employee_id=emp_id).count()
+            for model in (Attendance, AttendanceDaily, Performance)]
+
+
+def test_delete_employee_statements_independent_of_history(app):
+    bystander = _seed_employee(SMALL)
+    delete_employee(_seed_employee(SMALL))  # pemanasan: baris data_versions dibuat sekali
+    counts = []
+    for days in (SMALL, LARGE):
+        emp_id = _seed_employee(days)
+        with count_statements() as executed:
+            deleted = delete_employee(emp_id)
+        counts.append(len(executed))
+        assert deleted["attendance"] == 2 * days
+        assert deleted["attendance_daily"] == days
+        assert deleted["employees"] == 1
+        assert db.session.get(Employee, emp_id) is None
+        assert _children(emp_id) == [0, 0, 0]
+    assert counts[0] == counts[1], counts
+    assert _children(bystander) == [2 * SMALL, SMALL, SMALL // 30 + 1]
+
+
+def test_archive_employee_statements_independent_of_history(app):
+    archive_employee(db.session.get(Employee, _seed_employee(SMALL)))  # pemanasan
+    counts = []
+    for days in (SMALL, LARGE):
+        emp = db.session.get(Employee, _seed_employee(days))
+        with count_statements() as executed:
+            archive_employee(emp)
+        counts.append(len(executed))
+        assert emp.archived_at is not None
+        assert _children(emp.id)[0] == 2 * days  # riwayat tetap utuh
+    assert counts[0] == counts[1], counts
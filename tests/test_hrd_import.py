@@ -0,0 +1,26 @@
+import io
+
+from models import Employee
+from services.hrd_service import import_employees_csv
+
+HEADER = "name,department,position,join_date,salary\n"
+
+
+def _lines(data):
+    return io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline="")
+
+
+def test_import_reports_row_errors(app):
+    data = HEADER + "Ani,Ops,Staff,2024-01-01,100\n,Ops,Staff,2024-01-01,100\n"
+    report = import_employees_csv(_lines(data.encode()))
+    assert (report["inserted"], report["failed"]) == (1, 1)
+    assert report["errors"][0][0] == 3
+
+
+def test_import_non_utf8_file_is_reported_not_raised(app):
+    rows = "".join(f"Karyawan {i},Ops,Staff,2024-01-01,100\n" for i in range(2000))
+    data = (HEADER + rows + "Jos\xe9,Ops,Staff,2024-01-01,100\n").encode("cp1252")
+    report = import_employees_csv(_lines(data))
+    assert "UTF-8" in report["errors"][-1][1]
+    # baris sebelum blok yang rusak tetap masuk
+    assert Employee.query.count() == report["inserted"] > 0
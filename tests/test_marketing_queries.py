@@ -0,0 +1,48 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from models import db, MarketingProspect, MarketingLead, MarketingProject, MarketingFollowUp
+from services.marketing_service import MAX_PAGE_SIZE, count_statements, leads_page, projects_page
+
+N = 5
+
+
+def _seed(count):
+    """Tambah `count` rantai prospek -> lead -> proyek -> 2 follow-up."""
+    now = datetime(2026, 1, 1)
+    for i in range(count):
+        prospect = MarketingProspect(client_name=f"Client {i}", email=f"c{i}@example.com")
+        lead = MarketingLead(prospect=prospect, stage="Awal", created_at=now + timedelta(hours=i))
+        project = MarketingProject(lead=lead, project_name=f"Proyek {i}", budget=1000.0,
+                                   start_date=date(2026, 2, 1))
+        project.followups = [MarketingFollowUp(date=now), MarketingFollowUp(date=now)]
+        db.session.add(prospect)
+    db.session.commit()
+    db.session.expire_all()
+
+
+def _touch_leads(page):
+    return [(lead.stage, lead.created_at, lead.prospect.client_name, lead.prospect.email)
+            for lead in page.items]
+
+
+def _touch_projects(page):
+    return [(p.project_name, p.status, p.budget, p.start_date, p.end_date,
+             p.lead.stage, p.lead.prospect.client_name, [f.date for f in p.followups])
+            for p in page.items]
+
+
+@pytest.mark.parametrize("page_fn, touch", [
+    (leads_page, _touch_leads),
+    (projects_page, _touch_projects),
+])
+def test_statement_count_independent_of_rows(app, page_fn, touch):
+    counts = []
+    for added, total in ((N, N), (9 * N, 10 * N)):
+        _seed(added)
+        with count_statements() as executed:
+            rows = touch(page_fn(per_page=MAX_PAGE_SIZE))
+        assert len(rows) == total
+        counts.append(len(executed))
+    assert counts[0] == counts[1], counts
@@ -0,0 +1,55 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+from models import db, Attendance, Employee
+from services.hrd_service import PAYROLL_UTC_OFFSET, compute_payroll, working_days_in
+
+YEAR, MONTH = 2026, 1  # 22 hari kerja; 15 Jan hari Kamis
+
+
+def _employee(join_date, present_days):
+    emp = Employee(name=f"Karyawan {join_date}", salary=2_200_000.0, join_date=join_date)
+    db.session.add(emp)
+    db.session.flush()
+    rows = []
+    for day in present_days:
+        check_in = datetime.combine(day, datetime.min.time()) + timedelta(hours=8)
+        for status, ts in (("Masuk", check_in), ("Keluar", check_in + timedelta(hours=8))):
+            rows.append({"username": f"user{emp.id}", "employee_id": emp.id, "status": status,
+                         "timestamp": ts - PAYROLL_UTC_OFFSET, "day": day})
+    if rows:
+        db.session.execute(insert(Attendance), rows)
+    return emp.id
+
+
+def _weekdays(since):
+    return [since + timedelta(days=i) for i in range(31 - since.day + 1)
+            if (since + timedelta(days=i)).weekday() < 5]
+
+
+def test_working_days_from_join_date():
+    assert working_days_in(YEAR, MONTH) == 22
+    assert working_days_in(YEAR, MONTH, since=date(2025, 6, 1)) == 22
+    assert working_days_in(YEAR, MONTH, since=date(YEAR, MONTH, 15)) == len(_weekdays(date(YEAR, MONTH, 15)))
+
+
+def test_mid_month_joiner_not_charged_absence_before_join(app):
+    joined = date(YEAR, MONTH, 15)
+    veteran = _employee(date(2020, 1, 1), _weekdays(date(YEAR, MONTH, 1)))
+    newcomer = _employee(joined, _weekdays(joined))
+    future = _employee(date(YEAR, MONTH + 1, 2), [])
+    db.session.commit()
+
+    working_days, slips = compute_payroll(YEAR, MONTH)
+    by_id = {slip["employee_id"]: slip for slip in slips}
+    assert future not in by_id
+
+    assert by_id[veteran]["absence_deduction"] == 0
+    assert by_id[veteran]["net_pay"] == 2_200_000.0
+
+    slip = by_id[newcomer]
+    eligible = working_days_in(YEAR, MONTH, since=joined)
+    assert slip["absence_deduction"] == 0
+    assert slip["worked_days"] == eligible
+    assert slip["base_salary"] == slip["net_pay"] == round(2_200_000.0 / working_days * eligible, 2)
@@ -0,0 +1,81 @@
+import io
+from datetime import date
+
+import pytest
+
+from models import Transaction
+from services.accounting_service import (
+    _statement_header, import_statement_csv, parse_amount, parse_statement_row
+)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1.500.000,00", 1500000.0),
+    ("1,500,000.00", 1500000.0),
+    ("Rp 250.000", 250000.0),
+    ("1,500,000.00 CR", 1500000.0),
+    ("1.500.000,00DB", -1500000.0),
+    ("1.500.000,00 DB", -1500000.0),
+    ("75 D", -75.0),
+    ("75K", 75.0),
+    ("(250.00)", -250.0),
+    ("-75", -75.0),
+    ("", None),
+])
+def test_parse_amount(value, expected):
+    assert parse_amount(value) == expected
+
+
+def test_parse_amount_rejects_text():
+    with pytest.raises(ValueError):
+        parse_amount("abc")
+
+
+@pytest.mark.parametrize("header, row, category, amount", [
+    (["Tanggal", "Keterangan", "Jumlah"], ["05/01/2026", "Bayar listrik", "1.500.000,00DB"],
+     "expense", 1500000.0),
+    (["Tanggal", "Keterangan", "Jumlah"], ["05/01/2026", "Transfer masuk", "2.000,00 CR"],
+     "income", 2000.0),
+    (["Tanggal", "Keterangan", "Jumlah", "D/K"], ["2026-01-05", "Gaji", "500", "DEBET"],
+     "expense", 500.0),
+    (["Tanggal", "Keterangan", "Jumlah", "D/K"], ["2026-01-05", "Refund", "500", "K"],
+     "income", 500.0),
+    (["Tanggal", "Keterangan", "Debit", "Kredit"], ["2026-01-05", "ATK", "125.000,00", ""],
+     "expense", 125000.0),
+])
+def test_parse_statement_row(header, row, category, amount):
+    values = parse_statement_row(row, _statement_header(header), "BCA")
+    assert values["date"] == date(2026, 1, 5)
+    assert (values["category"], values["amount"], values["account"]) == (category, amount, "BCA")
+
+
+@pytest.mark.parametrize("row, message", [
+    (["kemarin", "x", "100"], "Tanggal"),
+    (["2026-01-05", "x", "abc"], "bukan angka"),
+    (["2026-01-05", "x", "0"], "nol"),
+])
+def test_parse_statement_row_invalid(row, message):
+    with pytest.raises(ValueError, match=message):
+        parse_statement_row(row, _statement_header(["Tanggal", "Keterangan", "Jumlah"]), "BCA")
+
+
+STATEMENT = """Rekening,BCA 123
+Tanggal,Keterangan,Jumlah
+05/01/2026,Transfer masuk,"2.000.000,00 CR"
+06/01/2026,Bayar listrik,"1.500.000,00DB"
+06/01/2026,Biaya admin,"10.000,00DB"
+06/01/2026,Biaya admin,"10.000,00DB"
+07/01/2026,Salah format,abc
+"""
+
+
+def test_reimport_reports_duplicates_only(app):
+    first = import_statement_csv(io.StringIO(STATEMENT), "BCA")
+    assert (first["inserted"], first["duplicates"], first["failed"]) == (4, 0, 1)
+    categories = sorted((t.description, t.category) for t in Transaction.query)
+    assert categories == [("Bayar listrik", "expense"), ("Biaya admin", "expense"),
+                          ("Biaya admin", "expense"), ("Transfer masuk", "income")]
+
+    again = import_statement_csv(io.StringIO(STATEMENT), "BCA")
+    assert (again["inserted"], again["duplicates"], again["failed"]) == (0, 4, 1)
+    assert Transaction.query.count() == 4